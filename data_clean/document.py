@@ -0,0 +1,219 @@
+import hashlib
+import shutil
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from data_clean.fileops import propagate_file, write_text_file
+
+
+def index_of(name: str) -> int:
+    """page_N / group_N 目录名中的编号"""
+    return int(name.split('_')[-1])
+
+def reset_directory(path: Path) -> None:
+    """清空或创建目录"""
+    if path.exists():
+        shutil.rmtree(path)
+    path.mkdir(parents=True)
+
+def export_tree(tree, output_dir: Path) -> None:
+    """把 Document、Page 或 Section 写出为目录树（调试用），先清空 output_dir"""
+    output_dir = Path(output_dir)
+    reset_directory(output_dir)
+    tree.export(output_dir)
+
+
+class Block:
+    """group 中的一个条目，对应原目录树中的一个文件：文本条目保存文字，图片条目只引用源文件路径；
+    从目录读入的文本条目同时记录源文件，内容未改动时写出可直接链接源文件"""
+
+    def __init__(self, name: str, text: Optional[str] = None, path: Optional[Path] = None):
+        self.name = name
+        self.text = text
+        self.path = path
+
+    @property
+    def stem(self) -> str:
+        return Path(self.name).stem
+
+    @property
+    def is_text(self) -> bool:
+        return self.name.lower().endswith('.txt')
+
+    def renamed(self, name: str) -> "Block":
+        """同一内容换一个文件名"""
+        return Block(name, self.text, self.path)
+
+    def export(self, output_dir: Path) -> None:
+        if self.path is not None:
+            propagate_file(self.path, output_dir / self.name)
+        elif self.text is not None:
+            write_text_file(output_dir / self.name, self.text)
+
+    def __repr__(self):
+        return f"Block({self.name})"
+
+
+class Group:
+    """一个 group：按文件名索引的条目；各步骤之间共享 Block 对象，只替换不修改"""
+
+    def __init__(self, name: str, blocks: Iterable[Block] = ()):
+        self.name = name
+        self.blocks: Dict[str, Block] = {}
+        for block in blocks:
+            self.put(block)
+
+    def put(self, block: Block) -> None:
+        """加入条目，同名条目被覆盖（相当于覆盖同名文件）"""
+        self.blocks[block.name] = block
+
+    def get(self, name: str) -> Optional[Block]:
+        return self.blocks.get(name)
+
+    def glob(self, pattern: str) -> List[Block]:
+        """按文件名通配符筛选条目，结果按文件名排序"""
+        return sorted((b for b in self.blocks.values() if fnmatch(b.name, pattern)), key=lambda b: b.name)
+
+    def copy(self, name: Optional[str] = None) -> "Group":
+        return Group(name or self.name, self.blocks.values())
+
+    @classmethod
+    def from_directory(cls, group_dir: Path) -> "Group":
+        group = cls(group_dir.name)
+        for item in sorted(group_dir.iterdir()):
+            if not item.is_file():
+                continue
+            if item.suffix.lower() == '.txt':
+                with open(item, 'r', encoding='utf-8', errors='ignore') as f:
+                    group.put(Block(item.name, text=f.read(), path=item))
+            else:
+                group.put(Block(item.name, path=item))
+        return group
+
+    def export(self, group_dir: Path) -> None:
+        group_dir.mkdir(parents=True, exist_ok=True)
+        for block in self.blocks.values():
+            block.export(group_dir)
+
+
+class Page:
+    """一个 page：按名称索引的 group"""
+
+    def __init__(self, name: str, groups: Iterable[Group] = ()):
+        self.name = name
+        self.groups: Dict[str, Group] = {g.name: g for g in groups}
+
+    def group(self, name: str) -> Group:
+        """取出指定名称的 group，不存在时新建（相当于 mkdir exist_ok）"""
+        if name not in self.groups:
+            self.groups[name] = Group(name)
+        return self.groups[name]
+
+    def sorted_groups(self) -> List[Group]:
+        """按编号排序的 group_N"""
+        return sorted((g for g in self.groups.values() if fnmatch(g.name, 'group_*')), key=lambda g: index_of(g.name))
+
+    @classmethod
+    def from_directory(cls, page_dir: Path, pattern: str = 'group_*') -> "Page":
+        return cls(page_dir.name, [Group.from_directory(d) for d in sorted(page_dir.glob(pattern)) if d.is_dir()])
+
+    def export(self, page_dir: Path) -> None:
+        page_dir.mkdir(parents=True, exist_ok=True)
+        for group in self.groups.values():
+            group.export(page_dir / group.name)
+
+
+class Document:
+    """扫描结果及各清洗步骤之间传递的文档：page → group → 条目，与原 output 目录树一一对应"""
+
+    def __init__(self, pages: Iterable[Page] = ()):
+        self.pages: Dict[str, Page] = {p.name: p for p in pages}
+
+    def page(self, name: str) -> Page:
+        """取出指定名称的 page，不存在时新建"""
+        if name not in self.pages:
+            self.pages[name] = Page(name)
+        return self.pages[name]
+
+    def sorted_pages(self) -> List[Page]:
+        return sorted(self.pages.values(), key=lambda p: index_of(p.name))
+
+    @classmethod
+    def from_directory(cls, input_dir: Path) -> "Document":
+        """读取 page_N/group_M 目录树：文本读入内存，图片只记录路径"""
+        input_dir = Path(input_dir)
+        return cls(Page.from_directory(d) for d in input_dir.glob('page_*') if d.is_dir())
+
+    @classmethod
+    def from_scan_result(cls, result) -> "Document":
+        """由 extract_blocks_from_pdf 返回的 ScanResult 构建，不再重新读取文本文件（裁剪图像须已写出）"""
+        document = cls()
+        for scan_page in result.pages:
+            page = document.page(f"page_{scan_page.number}")
+            for scan_group in scan_page.groups:
+                group = page.group(scan_group.name)
+                for scan_block in scan_group.blocks:
+                    if scan_block.text is not None:
+                        group.put(Block(f"{scan_block.file}.txt", text=scan_block.text))
+                    if image_path := scan_block.image_path:
+                        group.put(Block(f"{scan_block.file}.png", path=Path(image_path)))
+        return document
+
+    def fingerprint(self) -> str:
+        """文档内容的哈希：各条目的位置、文字以及所引用图片文件的内容"""
+        digest = hashlib.sha256()
+        for page_name in sorted(self.pages):
+            groups = self.pages[page_name].groups
+            for group_name in sorted(groups):
+                blocks = groups[group_name].blocks
+                for block_name in sorted(blocks):
+                    block = blocks[block_name]
+                    digest.update(f"{page_name}/{group_name}/{block_name}\0".encode())
+                    if block.text is not None:
+                        digest.update(block.text.encode())
+                    elif block.path is not None:
+                        with open(block.path, 'rb') as f:
+                            for chunk in iter(lambda: f.read(1 << 20), b''):
+                                digest.update(chunk)
+                    digest.update(b'\0')
+        return digest.hexdigest()
+
+    def export(self, output_dir: Path) -> None:
+        for page in self.pages.values():
+            page.export(output_dir / page.name)
+
+
+class Section:
+    """大纲中的一个章节，对应 output5 中的一个目录：标题原文（title.txt）、正文（merged_text.txt）与子章节"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.blocks: Dict[str, Block] = {}
+        self.children: Dict[str, "Section"] = {}
+
+    @property
+    def title(self) -> Optional[str]:
+        block = self.blocks.get('title.txt')
+        return block.text if block else None
+
+    @property
+    def text(self) -> Optional[str]:
+        block = self.blocks.get('merged_text.txt')
+        return block.text if block else None
+
+    def put(self, block: Block) -> None:
+        self.blocks[block.name] = block
+
+    def child(self, name: str) -> "Section":
+        """取出指定名称的子章节，不存在时新建"""
+        if name not in self.children:
+            self.children[name] = Section(name)
+        return self.children[name]
+
+    def export(self, section_dir: Path) -> None:
+        section_dir.mkdir(parents=True, exist_ok=True)
+        for block in self.blocks.values():
+            block.export(section_dir)
+        for child in self.children.values():
+            child.export(section_dir / child.name)
@@ -0,0 +1,66 @@
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Linux 的 FICLONE ioctl：在 btrfs、XFS 等文件系统上创建写时复制的副本（reflink）
+FICLONE = 0x40049409
+
+# 已确认不支持 reflink / 硬链接的 (源设备, 目标设备)，避免每个文件都重试
+_unsupported: Set[Tuple[str, int, int]] = set()
+_unsupported_lock = threading.Lock()
+
+
+def _devices(src: Path, dst_dir: Path) -> Tuple[int, int]:
+    return os.stat(src).st_dev, os.stat(dst_dir).st_dev
+
+
+def _reflink(src: Path, dst: Path) -> None:
+    if fcntl is None:
+        raise OSError("reflink 不可用")
+    try:
+        with open(src, 'rb') as s, open(dst, 'wb') as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    except OSError:
+        dst.unlink(missing_ok=True)
+        raise
+    shutil.copystat(src, dst)
+
+
+def propagate_file(src: Path, dst: Path) -> str:
+    """把 src 传递到 dst：优先 reflink（写时复制），其次硬链接，都不可用时才复制字节
+    返回实际采用的方式（reflink / link / copy）
+
+    硬链接与源文件共享数据，因此 dst 已存在时先删除再创建；data_clean 的各步骤只整体重写
+    输出目录而不原地修改文件，不会通过链接改动源文件。反过来，源文件被原地改写（如重新扫描到
+    同一目录）时，链接出的调试目录会随之改变"""
+    src, dst = Path(src), Path(dst)
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+    devices = _devices(src, dst.parent)
+    for method, func in (("reflink", _reflink), ("link", os.link)):
+        if (method,) + devices in _unsupported:
+            continue
+        try:
+            func(src, dst)
+            return method
+        except OSError:
+            with _unsupported_lock:
+                _unsupported.add((method,) + devices)
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def write_text_file(path: Path, text: str) -> None:
+    """写出文本文件；目标可能是指向其他文件的硬链接，先删除再写，避免改动链接的另一端"""
+    path = Path(path)
+    if path.exists() or path.is_symlink():
+        path.unlink()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
@@ -1,61 +1,80 @@
-import subprocess
+from functools import partial
 from pathlib import Path
-import sys
+from typing import List, Optional, Tuple
 
 # 导入 storedata.py 中的函数
-from data_clean.storedata import store_paper_data
+from data_clean.storedata import store_paper_outline
+from data_clean import storedata_dataclean, storedata_datacombine, picture_classify, picture_classify2, title_classify
+from data_clean.storedata_dataclean import clean_document
+from data_clean.storedata_datacombine import combine_groups, merge_pages
+from data_clean.picture_classify import PictureProcessor
+from data_clean.picture_classify2 import PictureRenamer
+from data_clean.title_classify import TitleProcessor
+from data_clean.document import Document, export_tree
+from data_clean.pipeline import Stage, StageCache, StageResult, run_dag
+from index.index_module import PaperInfo
 
-def run_script(script_name):
-    """更健壮的脚本执行函数"""
-    script_path = Path(__file__).parent / script_name
-    try:
-        result = subprocess.run(
-            [sys.executable, str(script_path)],
-            check=True,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            errors='replace'  # 替换无法解码的字符
-        )
-        return True
-    except subprocess.CalledProcessError as e:
-        # 尝试多种编码方式读取错误信息
-        for encoding in ['utf-8', 'gbk', 'latin1']:
-            try:
-                error_msg = e.stderr.decode(encoding)
-                print(f"❌ 执行失败: {script_name}\n错误信息:\n{error_msg}")
-                break
-            except:
-                continue
-        else:
-            print(f"❌ 执行失败: {script_name}\n无法解码的错误输出")
-        return False
+BASE_DIR = Path(__file__).parent
+# 各步骤结果的缓存目录，输入指纹未变化的步骤直接取回上次的结果
+STAGE_CACHE_DIR = BASE_DIR / ".stage_cache"
 
-def main_data_process():
-    print("=== 开始处理数据 ===")
-    
-    steps = [
-        "storedata_dataclean.py",
-        "storedata_datacombine.py",
-        "picture_classify.py",
-        "picture_classify2.py",
-        "title_classify.py"
+def load_document(input_dir: Path) -> Document:
+    """读取扫描结果目录（output2）"""
+    if not input_dir.exists():
+        raise FileNotFoundError(f"输入目录不存在: {input_dir}")
+    return Document.from_directory(input_dir)
+
+def data_stages(base_dir: Path, document: Optional[Document] = None,
+                export_dir: Optional[Path] = None) -> List[Stage]:
+    """全部处理步骤及其输入步骤组成的依赖图：文字分支（dataclean → datacombine → title_classify）与
+    图片分支（picture_classify → picture_classify2）都只依赖扫描结果，可以同时执行，storedata 等待两者；
+    各步骤在内存中传递 Document，export_dir 不为空时按原目录名（output0 等）写出每一步的结果"""
+    def stage(name, func, inputs, module, output):
+        # 写出在缓存命中时同样执行，调试目录总与本次结果一致
+        export = partial(export_tree, output_dir=export_dir / output) if export_dir is not None else None
+        return Stage(name, func, inputs, module.STAGE_VERSION, export=export)
+
+    load = (lambda: document) if document is not None else partial(load_document, base_dir / "output2")
+    return [
+        Stage("load", load, version=1),
+        stage("storedata_dataclean", clean_document, ("load",), storedata_dataclean, "output0"),
+        stage("datacombine_groups", combine_groups, ("storedata_dataclean",), storedata_datacombine, "output3"),
+        stage("datacombine_pages", merge_pages, ("datacombine_groups",), storedata_datacombine, "output4"),
+        stage("picture_classify", PictureProcessor().process, ("load",), picture_classify, "output_picture"),
+        stage("picture_classify2", PictureRenamer().process, ("picture_classify",), picture_classify2,
+              "output_picture0"),
+        stage("title_classify", lambda doc: TitleProcessor().process(doc), ("datacombine_pages",), title_classify,
+              "output5"),
+        # PaperInfo 构建很快且不一定可以序列化，不缓存
+        Stage("storedata", store_paper_outline, ("title_classify", "picture_classify2")),
     ]
 
-    for script in steps:
-        print(f"\n▶ 正在执行: {script}")
-        if not run_script(script):
-            print("❗ 处理中断！")
-            return
+def run_data_pipeline(base_dir: Path = BASE_DIR, document: Optional[Document] = None,
+                      export_dir: Optional[Path] = None,
+                      cache_dir: Optional[Path] = STAGE_CACHE_DIR) -> Tuple[Optional[PaperInfo], List[StageResult]]:
+    """在当前进程中按依赖关系执行全部步骤，互不依赖的分支在线程池中并发，返回 (论文信息, 各步骤结果)；
+    任一步骤失败时论文信息为 None
+    document 不为空时直接处理它（如 Document.from_scan_result），否则读取 base_dir/output2；
+    cache_dir 不为空时跳过输入指纹（扫描内容哈希 + 各步骤版本）与上次相同的步骤，为 None 时全部重新执行"""
+    cache = StageCache(cache_dir) if cache_dir is not None else None
+    results = run_dag(data_stages(Path(base_dir), document, export_dir), cache=cache)
+    if any(not result.ok for result in results) or results[-1].name != "storedata":
+        return None, results
+    return results[-1].value, results
 
-    print("\n▶ 正在执行: storedata.py")
-    # 获取 storedata.py 的输出目录路径
-    base_dir = Path(__file__).parent
-    output5_dir = base_dir / "output5"
-    output_picture0_dir = base_dir / "output_picture0"
+def main_data_process(document: Optional[Document] = None, export_dir: Optional[Path] = None):
+    """document 为空时读取 output2；export_dir 不为空时写出各步骤的中间目录，便于调试"""
+    print("=== 开始处理数据 ===")
 
-    # 调用 storedata.py 中的 store_paper_data 函数
-    paper_info = store_paper_data(output5_dir, output_picture0_dir)
+    paper_info, results = run_data_pipeline(document=document, export_dir=export_dir)
+    for result in results:
+        status = "✔" if result.ok else "❌"
+        print(f"{status} {result.name}: {result.seconds:.2f}s{'（未变化，已跳过）' if result.cached else ''}")
+    if failed := [result for result in results if not result.ok]:
+        for result in failed:
+            print(f"❌ 执行失败: {result.name}\n错误信息:\n{result.format_error()}")
+        print("❗ 处理中断！")
+        return
 
     if paper_info:
         print("\n✅ 所有处理步骤已完成")
@@ -70,7 +89,7 @@ def main_data_process():
         #     print(f"描述: {img['description']}")
         #     print("-" * 40)
     else:
-        print("❌ storedata.py 未成功返回论文信息。")
+        print("❌ storedata 未成功返回论文信息。")
     return paper_info
 
 
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class Stage:
+    """一个处理步骤：名称、函数及输入步骤名称，函数的参数为各输入步骤的返回值
+    version 不为空时按输入指纹缓存结果，步骤逻辑改变后应递增版本号；没有输入的步骤（如读取扫描结果）
+    总会执行，其指纹取自返回值的 fingerprint()；export 不为空时以结果调用它（如写出调试目录），
+    结果取自缓存时同样调用"""
+
+    def __init__(self, name: str, func: Callable, inputs: Tuple[str, ...] = (), version: Optional[Any] = None,
+                 export: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        self.version = version
+        self.export = export
+
+    def fingerprint(self, input_fingerprints: List[Optional[str]]) -> Optional[str]:
+        """由步骤名称、版本与输入指纹计算本步骤的指纹，任一部分缺失时返回 None（不缓存）"""
+        if self.version is None or any(f is None for f in input_fingerprints):
+            return None
+        payload = json.dumps([self.name, self.version, input_fingerprints], default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class StageCache:
+    """按指纹保存各步骤的结果（pickle），每个步骤只保留最近一次的结果"""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+
+    def load(self, name: str, fingerprint: str) -> Tuple[bool, Any]:
+        """返回 (是否命中, 结果)"""
+        try:
+            with open(self.cache_dir / f"{name}.pkl", "rb") as f:
+                entry = pickle.load(f)
+        except Exception:
+            return False, None
+        if entry.get("fingerprint") != fingerprint:
+            return False, None
+        return True, entry["value"]
+
+    def store(self, name: str, fingerprint: str, value: Any) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_dir / f"{name}.pkl.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump({"fingerprint": fingerprint, "value": value}, f)
+            os.replace(tmp_path, self.cache_dir / f"{name}.pkl")
+        except Exception as e:
+            # 缓存写入失败不影响本次处理结果
+            print(f"⚠ 无法缓存步骤 {name} 的结果: {e}")
+
+
+class StageResult:
+    """单个处理步骤的结果：名称、耗时（秒）、返回值、出错时的异常，以及指纹和是否取自缓存"""
+
+    def __init__(self, name: str, seconds: float, value: Any = None, error: Optional[BaseException] = None,
+                 fingerprint: Optional[str] = None, cached: bool = False):
+        self.name = name
+        self.seconds = seconds
+        self.value = value
+        self.error = error
+        self.fingerprint = fingerprint
+        self.cached = cached
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def format_error(self) -> str:
+        """出错时返回完整的异常堆栈，否则返回空字符串"""
+        if self.error is None:
+            return ""
+        return "".join(traceback.format_exception(type(self.error), self.error, self.error.__traceback__))
+
+
+def run_stage(stage: Stage, args: List[Any], input_fingerprints: List[Optional[str]],
+              cache: Optional[StageCache] = None) -> StageResult:
+    """在当前进程中执行一个步骤并计时，异常（包括计算指纹和写出时的异常）作为结果返回而不是抛出；
+    输入指纹与上次相同时直接取回缓存的结果，stage.export 照常执行"""
+    start = time.perf_counter()
+    fingerprint = stage.fingerprint(input_fingerprints) if stage.inputs else None
+    try:
+        hit, value = False, None
+        if cache is not None and fingerprint is not None:
+            hit, value = cache.load(stage.name, fingerprint)
+        if not hit:
+            value = stage.func(*args)
+            if not stage.inputs and hasattr(value, "fingerprint"):
+                # 数据源步骤：以读到的内容作为指纹
+                fingerprint = stage.fingerprint([value.fingerprint()])
+            elif cache is not None and fingerprint is not None:
+                cache.store(stage.name, fingerprint, value)
+        if stage.export is not None:
+            stage.export(value)
+    except Exception as e:
+        return StageResult(stage.name, time.perf_counter() - start, error=e)
+    return StageResult(stage.name, time.perf_counter() - start, value=value, fingerprint=fingerprint, cached=hit)
+
+
+def run_dag(stages: List[Stage], max_workers: Optional[int] = None,
+            cache: Optional[StageCache] = None) -> List[StageResult]:
+    """按依赖关系并发执行各步骤：输入全部完成的步骤立即提交到线程池，互不依赖的分支同时执行；
+    任一步骤失败后不再启动新的步骤，等待已启动的步骤结束；cache 不为空时跳过输入未变化的步骤
+    返回已执行步骤的结果，顺序与 stages 一致"""
+    names = [stage.name for stage in stages]
+    pending = {stage.name: stage for stage in stages}
+    for stage in stages:
+        if unknown := [i for i in stage.inputs if i not in pending]:
+            raise ValueError(f"步骤 {stage.name} 依赖未定义的步骤: {unknown}")
+
+    results: Dict[str, StageResult] = {}
+    running: Dict[Future, str] = {}
+    failed = False
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages)) as pool:
+        while True:
+            if not failed:
+                ready = [stage for stage in pending.values() if all(i in results for i in stage.inputs)]
+                for stage in ready:
+                    del pending[stage.name]
+                    print(f"\n▶ 正在执行: {stage.name}")
+                    inputs = [results[i] for i in stage.inputs]
+                    future = pool.submit(run_stage, stage, [r.value for r in inputs],
+                                         [r.fingerprint for r in inputs], cache)
+                    running[future] = stage.name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results[running.pop(future)] = result
+                failed = failed or not result.ok
+    if pending and not failed:
+        raise ValueError(f"步骤之间存在循环依赖: {list(pending)}")
+    return [results[name] for name in names if name in results]
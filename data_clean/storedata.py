@@ -62,7 +62,10 @@ def collect_images(paper_info, output_picture0_dir):
                 })
                 #print(f"已登记图片：{img_num} (路径: {img_path})")
 
-    # 按图片编号排序
+    sort_images(paper_info)
+
+def sort_images(paper_info):
+    """按图片编号排序"""
     paper_info.image_list.sort(key=lambda x: (
         int(''.join(filter(str.isdigit, x['number']))) if any(c.isdigit() for c in x['number']) else float('inf'),
         x['number']
@@ -94,15 +97,7 @@ def initialize_paper_info(output5_dir):
         paper_title = "Untitled Paper"  # 默认标题
 
     # 2. 初始化PaperInfo
-    ppt_date = datetime.now().strftime("%Y-%m-%d")
-    paper_info = PaperInfo(
-        title=paper_title,
-        authors=["待补充"],
-        date="待补充",
-        journal="待补充",
-        ppt_presenter="汇报人",
-        ppt_date=ppt_date
-    )
+    paper_info = new_paper_info(paper_title)
     # 3. 添加摘要内容（来自merged_text.txt）
     abstract_file = os.path.join(output5_dir, "文章标题", "merged_text.txt")
     if os.path.exists(abstract_file):
@@ -113,6 +108,26 @@ def initialize_paper_info(output5_dir):
     
     return paper_info
 
+def new_paper_info(paper_title):
+    """以默认的作者、日期等信息初始化PaperInfo"""
+    ppt_date = datetime.now().strftime("%Y-%m-%d")
+    return PaperInfo(
+        title=paper_title,
+        authors=["待补充"],
+        date="待补充",
+        journal="待补充",
+        ppt_presenter="汇报人",
+        ppt_date=ppt_date
+    )
+
+def chapter_sort_key(name):
+    """数字章节在前（按数字排序），附录在后（按字母排序）"""
+    return (float(name.split('.')[0]) if name[0].isdigit() else float('inf'), name)
+
+def subchapter_sort_key(name):
+    """子章节按第二级编号排序"""
+    return (float(name.split('.')[1]) if '.' in name and name.split('.')[1].isdigit() else float('inf'), name)
+
 def build_outline_structure(paper_info, output5_dir):
     """构建大纲结构，正确处理数字章节和附录"""
     chapters = []
@@ -123,10 +138,7 @@ def build_outline_structure(paper_info, output5_dir):
             chapters.append(entry)
     
     # 改进的排序逻辑：数字章节在前，附录在后
-    chapters.sort(key=lambda x: (
-        float(x.split('.')[0]) if x[0].isdigit() else float('inf'),  # 数字章节按数字排序
-        x  # 附录按字母排序
-    ))
+    chapters.sort(key=chapter_sort_key)
     
     for chapter in chapters:
         chapter_path = os.path.join(output5_dir, chapter)
@@ -151,10 +163,7 @@ def _add_chapter_recursive(parent_node, current_path):
             subchapters.append(entry)
     
     # 子章节排序逻辑
-    subchapters.sort(key=lambda x: (
-        float(x.split('.')[1]) if '.' in x and x.split('.')[1].isdigit() else float('inf'),
-        x
-    ))
+    subchapters.sort(key=subchapter_sort_key)
     
     for subchapter in subchapters:
         _add_chapter_recursive(current_node, os.path.join(current_path, subchapter))
@@ -174,6 +183,45 @@ def add_content_to_sections(paper_info, output5_dir):
                     node.content = SectionContent(text=f.read())
 
 
+def store_paper_outline(outline, pictures):
+    """与 store_paper_data 相同，但直接使用内存中的大纲（title_classify）与图片（picture_classify2），不读目录"""
+    article = outline.children.get("文章标题")
+    paper_title = article.title.strip() if article and article.title is not None else "Untitled Paper"
+    paper_info = new_paper_info(paper_title)
+    if article and article.text is not None:
+        paper_info.outline_root.name = paper_title  # 更新根节点名称
+        paper_info.outline_root.content = SectionContent(text=article.text)
+
+    chapters = sorted((name for name in outline.children if name != "文章标题"), key=chapter_sort_key)
+    for chapter in chapters:
+        _add_section_recursive(paper_info.outline_root, outline.children[chapter])
+
+    paper_info.image_list = []
+    paper_info.image_descriptions = {}
+    for group in pictures.groups.values():
+        for png_block in (b for b in group.blocks.values() if b.name.lower().endswith('.png')):
+            img_num = png_block.stem
+            description = ""
+            for txt_name in [f"{img_num}.txt", f"{group.name}.txt", "description.txt"]:
+                if txt_block := group.get(txt_name):
+                    description = txt_block.text.strip()
+                    break
+            paper_info.image_list.append({
+                'number': img_num,
+                'path': os.path.abspath(png_block.path),
+                'description': description
+            })
+    sort_images(paper_info)
+    return paper_info
+
+def _add_section_recursive(parent_node, section):
+    """递归添加章节和子章节（内存版本）"""
+    content = SectionContent(text=section.text) if section.text is not None else None
+    current_node = Node(section.name, parent=parent_node, content=content)
+    for name in sorted(section.children, key=subchapter_sort_key):
+        _add_section_recursive(current_node, section.children[name])
+
+
 if __name__ == "__main__":
     # 使用相对路径时自动转换为基于脚本位置的绝对路径
     # base_dir = os.path.dirname(os.path.abspath(__file__))
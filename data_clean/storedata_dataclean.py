@@ -1,7 +1,14 @@
 import os
 import re
+import sys
 from pathlib import Path
-import shutil
+
+# 添加项目根目录到Python路径，便于单独运行本脚本
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_clean.document import Block, Document, Page, export_tree, index_of
+
+# 处理逻辑改变后递增，使 main_processor 中缓存的本步骤结果失效
+STAGE_VERSION = 1
 
 def is_title(text):
     """判断文本是否是标题，并提取标题内容"""
@@ -23,80 +30,76 @@ def is_title(text):
                     return True, title_content  # 返回标题内容
     return False, None
 
-def process_group(group_dir, output_dir, next_group_index):
-    """处理单个group文件夹"""
-    print(f"处理组: {group_dir}")
+def process_group(group, output_page, next_group_index):
+    """处理单个group"""
+    print(f"处理组: {group.name}")
     
     # 创建初始输出组
-    current_output_group = output_dir / f"group_{next_group_index}"
-    current_output_group.mkdir(parents=True, exist_ok=True)
-    print(f"  创建输出组: {current_output_group}")
+    current_output_group = output_page.group(f"group_{next_group_index}")
     
-    # 复制标题文本文件
-    for item in group_dir.iterdir():
-        if item.is_file() and (item.name in ['00_title.txt']):
-            shutil.copy2(item, current_output_group / item.name)
-            print(f"    复制文件: {item.name} 到 {current_output_group}")
+    # 保留标题文本
+    if title_block := group.get('00_title.txt'):
+        current_output_group.put(title_block)
     
-    # 获取所有普通文本文件并按数字排序
-    text_files = sorted(
-        [f for f in group_dir.glob('*_text.txt') if f.name not in ['00_title.txt']],
+    # 获取所有普通文本并按数字排序
+    text_blocks = sorted(
+        [b for b in group.glob('*_text.txt') if b.name not in ['00_title.txt']],
         key=lambda x: int(x.stem.split('_')[0])
     )
     
-    i = 0
-    while i < len(text_files):
-        text_file = text_files[i]
-        with open(text_file, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
+    for text_block in text_blocks:
+        content = text_block.text
         
         is_title_result, title_content = is_title(content)
         if is_title_result:
             print(f"    发现标题: {title_content}")
             # 创建新组
             next_group_index += 1
-            current_output_group = output_dir / f"group_{next_group_index}"
-            current_output_group.mkdir(exist_ok=True)
-            print(f"    创建新组: {current_output_group}")
+            current_output_group = output_page.group(f"group_{next_group_index}")
+            print(f"    创建新组: {current_output_group.name}")
             
             # 将标题存储为新组的00_title.txt
-            with open(current_output_group / '00_title.txt', 'w', encoding='utf-8') as f:
-                f.write(title_content)
+            current_output_group.put(Block('00_title.txt', text=title_content))
             
             # 将标题之后的内容存储为新组的00_text.txt
             remaining_content = content[len(title_content):].strip()
             if remaining_content:
-                with open(current_output_group / '00_text.txt', 'w', encoding='utf-8') as f:
-                    f.write(remaining_content)
+                current_output_group.put(Block('00_text.txt', text=remaining_content))
         else:
-            # 不包含标题，将该文件复制到当前组
-            output_text_file = current_output_group / text_file.name
-            shutil.copy2(text_file, output_text_file)
-            print(f"    复制普通文本文件: {text_file.name} 到 {current_output_group}")
-        
-        i += 1  # 处理下一个文件
+            # 不包含标题，该文本原样归入当前组
+            current_output_group.put(text_block)
     
     return next_group_index + 1  # 返回下一个可用的group索引
-def process_page(page_dir, output_dir, page_index):
-    """处理单个page文件夹"""
-    print(f"\n处理页面: {page_dir}")
-    # 创建输出page目录
-    output_page_dir = output_dir / f"page_{page_index}"
-    output_page_dir.mkdir(exist_ok=True)
-    print(f"创建输出页面: {output_page_dir}")
+def process_page(page, page_index):
+    """处理单个page，返回重新分组后的 page_{page_index}"""
+    print(f"\n处理页面: {page.name}")
+    output_page = Page(f"page_{page_index}")
     
     # 获取当前页面的第一个group的索引
-    first_group = sorted(page_dir.glob('group_*'), key=lambda x: int(x.stem.split('_')[1]))
-    if first_group:
-        next_group_index = int(first_group[0].stem.split('_')[1])  # 从第一个group的索引开始
+    groups = page.sorted_groups()
+    if groups:
+        next_group_index = index_of(groups[0].name)  # 从第一个group的索引开始
     else:
         next_group_index = 0  # 如果没有group，从0开始
     
     # 按group编号排序处理
-    for group_dir in sorted(page_dir.glob('group_*'), key=lambda x: int(x.stem.split('_')[1])):
-        if group_dir.is_dir():
-            print(f"\n处理输入组: {group_dir}")
-            next_group_index = process_group(group_dir, output_page_dir, next_group_index)
+    for group in groups:
+        next_group_index = process_group(group, output_page, next_group_index)
+    return output_page
+
+def clean_document(document):
+    """清洗扫描结果：拆分正文中的标题并重排group，返回新的 Document（对应原 output0）"""
+    # 处理每个页面（按page编号排序），重新从1开始编号
+    return Document(process_page(page, page_index)
+                    for page_index, page in enumerate(document.sorted_pages(), start=1))
+
+def clean_pages(input_dir, output_dir):
+    """目录版本：读取 input_dir，清洗后写出到 output_dir"""
+    input_dir = Path(input_dir)
+    output_dir = Path(output_dir)
+    print(f"输入目录: {input_dir}")
+    print(f"输出目录: {output_dir}")
+    export_tree(clean_document(Document.from_directory(input_dir)), output_dir)
 
 def main():
     # # 定义输入输出路径 原代码
@@ -107,25 +110,7 @@ def main():
     base_dir = Path(__file__).parent  # 指向data_clean目录
     input_dir = base_dir / 'output2'  # 输入目录
     output_dir = base_dir / 'output0' # 输出目录
-
-    print(f"输入目录: {input_dir}")
-    print(f"输出目录: {output_dir}")
-    
-    # 清空或创建输出目录
-    if output_dir.exists():
-        for item in output_dir.glob('*'):
-            if item.is_file():
-                item.unlink()
-            else:
-                shutil.rmtree(item)
-    output_dir.mkdir(exist_ok=True)
-    print(f"清空或创建输出目录: {output_dir}")
-    
-    # 处理每个页面（按page编号排序）
-    page_dirs = sorted(input_dir.glob('page_*'), key=lambda x: int(x.stem.split('_')[1]))
-    for page_index, page_dir in enumerate(page_dirs, start=1):
-        if page_dir.is_dir():
-            process_page(page_dir, output_dir, page_index)
+    clean_pages(input_dir, output_dir)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -1,8 +1,15 @@
 import os
 import re
+import sys
 from pathlib import Path
 from difflib import SequenceMatcher
-import shutil
+
+# 添加项目根目录到Python路径，便于单独运行本脚本
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_clean.document import Block, Document, Page, export_tree
+
+# 处理逻辑改变后递增，使 main_processor 中缓存的本步骤结果失效
+STAGE_VERSION = 1
 
 def is_special_text(text):
     """判断是否是特殊文本（图片说明或列表标题）"""
@@ -31,50 +38,43 @@ def find_overlap(a, b, min_overlap=20):
         return a[match.a: match.a + match.size]
     return ""
 
-def process_group(group_dir, output_dir):
-    """处理单个group文件夹"""
-    print(f"处理组: {group_dir}")
-    # 获取所有text文件并按数字排序
-    text_files = sorted(
-        [f for f in group_dir.glob('*_text.txt')],
+def process_group(group, output, page_name):
+    """处理单个group，结果放入 output 的同名page与group"""
+    print(f"处理组: {group.name}")
+    # 获取所有text条目并按数字排序
+    text_blocks = sorted(
+        group.glob('*_text.txt'),
         key=lambda x: int(x.stem.split('_')[0])
     )
     
-    if not text_files:
-        print(f"  跳过空组: {group_dir}")
+    if not text_blocks:
+        print(f"  跳过空组: {group.name}")
         return
     
-    # 创建输出目录结构
-    rel_path = group_dir.relative_to(group_dir.parent.parent)
-    output_group_dir = output_dir / rel_path
-    output_group_dir.mkdir(parents=True, exist_ok=True)
+    # 创建输出group（只有存在文本的group才会创建所在的page）
+    output_group = output.page(page_name).group(group.name)
     
     # 分离特殊文本和普通文本
-    special_texts = []
+    special_blocks = []
     normal_texts = []
     special_text_indices = set()  # 记录特殊文本的索引
     
-    for i, text_file in enumerate(text_files):
-        with open(text_file, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            if is_special_text(content):
-                special_texts.append((text_file.name, content))
-                special_text_indices.add(i)
-            else:
-                normal_texts.append(content)
+    for i, text_block in enumerate(text_blocks):
+        if is_special_text(text_block.text):
+            special_blocks.append(text_block)
+            special_text_indices.add(i)
+        else:
+            normal_texts.append(text_block.text)
     
     # 处理特殊文本：保持原样单独保存，并保留对应的PNG
-    for filename, content in special_texts:
-        # 保存文本文件
-        with open(output_group_dir / filename, 'w', encoding='utf-8') as f:
-            f.write(content)
-        print(f"  保存特殊文本: {filename}")
+    for text_block in special_blocks:
+        output_group.put(text_block)
+        print(f"  保存特殊文本: {text_block.name}")
         
-        # 复制对应的PNG文件（如果有）
-        png_file = group_dir / filename.replace('_text.txt', '_text.png')
-        if png_file.exists():
-            shutil.copy2(png_file, output_group_dir / png_file.name)
-            print(f"  复制PNG文件: {png_file.name}")
+        # 保留对应的PNG（如果有）
+        if png_block := group.get(text_block.name.replace('_text.txt', '_text.png')):
+            output_group.put(png_block)
+            print(f"  保留PNG文件: {png_block.name}")
     
    # 处理普通文本：合并为一个文件（优化重叠检测）
     if normal_texts:
@@ -93,54 +93,49 @@ def process_group(group_dir, output_dir):
                 merged_content += "\n" + next_text
         
         # 保存合并后的普通文本
-        with open(output_group_dir / 'merged_text.txt', 'w', encoding='utf-8') as f:
-            f.write(merged_content)
+        output_group.put(Block('merged_text.txt', text=merged_content))
                
-    # 复制其他非文本文件（标题文件等）
-    for item in group_dir.iterdir():
-        # 跳过普通文本对应的PNG文件（这些不需要复制）
+    # 保留其他非文本条目（标题文件等）
+    for item in list(group.blocks.values()):
+        # 跳过普通文本对应的PNG文件（这些不需要保留）
         if item.name.endswith('_text.png'):
             # 检查是否是特殊文本对应的PNG（已经在上面处理过）
             text_index = int(item.stem.split('_')[0])
             if text_index not in special_text_indices:
                 continue  # 普通文本的PNG跳过
         
-        if not item.name.endswith('_text.txt'):  # 文本文件已经处理过
-            if item.is_file():
-                shutil.copy2(item, output_group_dir / item.name)
-                print(f"  复制其他文件: {item.name}")
+        if not item.name.endswith('_text.txt'):  # 文本条目已经处理过
+            output_group.put(item)
+            print(f"  保留其他条目: {item.name}")
 
-def process_page(page_dir, output_dir):
-    """处理单个page文件夹"""
-    print(f"处理页面: {page_dir}")
-    for group_dir in sorted(page_dir.glob('group_*'), key=lambda x: int(x.stem.split('_')[1])):
-        if group_dir.is_dir():
-            process_group(group_dir, output_dir)
+def combine_groups(document):
+    """合并每个group中的普通文本，返回新的 Document（对应原 output3）"""
+    result = Document()
+    for page in document.sorted_pages():
+        print(f"处理页面: {page.name}")
+        for group in page.sorted_groups():
+            process_group(group, result, page.name)
+    return result
 
-def merge_pages(input_dir, output_dir):
-    """跨页面合并group"""
+def merge_pages(document):
+    """跨页面合并group，所有group重新编号后放入唯一的 page_1（对应原 output4）"""
     print("开始跨页面合并...")
     # 获取所有页面
-    pages = sorted(input_dir.glob('page_*'), key=lambda x: int(x.stem.split('_')[1]))
+    pages = document.sorted_pages()
     
     if not pages:
-        print("没有找到页面文件夹，跳过合并。")
-        return
-    
-    # 创建最终的page_1目录
-    final_page_dir = output_dir / 'page_1'
-    final_page_dir.mkdir(exist_ok=True)
-    print(f"创建最终页面目录: {final_page_dir}")
+        print("没有找到页面，跳过合并。")
+        return Document()
     
-    # 初始化组列表
+    # 初始化组列表；合并只修改这里的副本，不影响输入的 Document
     groups = []
     
     # 遍历每个页面的组
     for page_idx, page in enumerate(pages):
-        print(f"处理页面: {page}")
-        page_groups = sorted(page.glob('group_*'), key=lambda x: int(x.stem.split('_')[1]))
+        print(f"处理页面: {page.name}")
+        page_groups = [g.copy() for g in page.sorted_groups()]
         if not page_groups:
-            print(f"  页面 {page} 没有组，跳过。")
+            print(f"  页面 {page.name} 没有组，跳过。")
             continue
         
         # 如果是第一个页面，直接添加所有组
@@ -151,21 +146,19 @@ def merge_pages(input_dir, output_dir):
         
         # 检查当前页面的第一个组是否是group_0
         current_first_group = page_groups[0]
-        is_group_zero = current_first_group.stem == "group_0"
+        is_group_zero = current_first_group.name == "group_0"
         
         if is_group_zero and groups:  # 只有当存在group_0且前页有组时才合并
             last_group = groups[-1]
-            print(f"  合并 {current_first_group} (group_0) 到 {last_group}")
+            print(f"  合并 {page.name}/{current_first_group.name} (group_0) 到 {last_group.name}")
             
             # 合并文本
-            last_merged_text = last_group / 'merged_text.txt'
-            current_merged_text = current_first_group / 'merged_text.txt'
+            last_merged_text = last_group.get('merged_text.txt')
+            current_merged_text = current_first_group.get('merged_text.txt')
             
-            if last_merged_text.exists() and current_merged_text.exists():
-                with open(last_merged_text, 'r', encoding='utf-8') as f:
-                    last_content = f.read()
-                with open(current_merged_text, 'r', encoding='utf-8') as f:
-                    current_content = f.read()
+            if last_merged_text and current_merged_text:
+                last_content = last_merged_text.text
+                current_content = current_merged_text.text
                 
                 overlap = find_overlap(last_content, current_content)
                 if overlap:
@@ -175,15 +168,12 @@ def merge_pages(input_dir, output_dir):
                     last_content += "\n" + current_content
                 
                 # 保存合并后的文本
-                with open(last_merged_text, 'w', encoding='utf-8') as f:
-                    f.write(last_content)
-                print(f"  保存合并后的文本: {last_merged_text}")
+                last_group.put(Block('merged_text.txt', text=last_content))
             
-            # 复制当前页面的group_0的其他文件
-            for item in current_first_group.iterdir():
+            # 并入当前页面的group_0的其他条目
+            for item in current_first_group.blocks.values():
                 if item.name != 'merged_text.txt':
-                    shutil.copy2(item, last_group / item.name)
-                    print(f"  复制文件: {item.name}")
+                    last_group.put(item)
             
             # 添加当前页面的剩余组（从group_1开始）
             groups.extend(page_groups[1:])
@@ -193,11 +183,25 @@ def merge_pages(input_dir, output_dir):
             groups.extend(page_groups)
             print(f"  添加所有组（无group_0或前页无组）: {len(page_groups)}")
     
-    # 将合并后的组复制到最终的page_1目录
-    for i, group in enumerate(groups):
-        target_group_dir = final_page_dir / f'group_{i}'
-        shutil.copytree(group, target_group_dir)
-        print(f"复制组 {group} 到 {target_group_dir}")
+    # 合并后的组重新编号，放入最终的page_1
+    return Document([Page('page_1', [g.copy(f'group_{i}') for i, g in enumerate(groups)])])
+
+def combine_pages(input_dir, output3_dir, output4_dir):
+    """目录版本：合并各group的正文（写出到 output3_dir），再跨页面合并group（写出到 output4_dir）"""
+    input_dir = Path(input_dir)
+    output3_dir = Path(output3_dir)
+    output4_dir = Path(output4_dir)
+    print(f"输入目录: {input_dir}")
+    print(f"中间输出目录: {output3_dir}")
+    print(f"最终输出目录: {output4_dir}")
+    
+    combined = combine_groups(Document.from_directory(input_dir))
+    export_tree(combined, output3_dir)
+    export_tree(merge_pages(combined), output4_dir)
+    
+    print(f"处理完成！中间结果已保存到 {output3_dir}")
+    print(f"处理完成！最终结果已保存到 {output4_dir}")
+
 def main():
     # 定义输入输出路径
     # base_dir = Path(__file__).parent.parent
@@ -209,41 +213,7 @@ def main():
     input_dir = base_dir / 'output0'
     output3_dir = base_dir / 'output3'  # 中间结果
     output4_dir = base_dir / 'output4'  # 最终结果
-
-    print(f"输入目录: {input_dir}")
-    print(f"中间输出目录: {output3_dir}")
-    print(f"最终输出目录: {output4_dir}")
-    
-    # 清空或创建中间输出目录
-    if output3_dir.exists():
-        for item in output3_dir.glob('*'):
-            if item.is_file():
-                item.unlink()
-            else:
-                shutil.rmtree(item)
-    output3_dir.mkdir(exist_ok=True)
-    print(f"清空或创建中间输出目录: {output3_dir}")
-    
-    # 处理每个页面
-    for page_dir in sorted(input_dir.glob('page_*'), key=lambda x: int(x.stem.split('_')[1])):
-        if page_dir.is_dir():
-            process_page(page_dir, output3_dir)
-    
-    # 清空或创建最终输出目录
-    if output4_dir.exists():
-        for item in output4_dir.glob('*'):
-            if item.is_file():
-                item.unlink()
-            else:
-                shutil.rmtree(item)
-    output4_dir.mkdir(exist_ok=True)
-    print(f"清空或创建最终输出目录: {output4_dir}")
-    
-    # 合并页面
-    merge_pages(output3_dir, output4_dir)
-    
-    print(f"处理完成！中间结果已保存到 {output3_dir}")
-    print(f"处理完成！最终结果已保存到 {output4_dir}")
+    combine_pages(input_dir, output3_dir, output4_dir)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,26 +1,27 @@
+import os
 import re
+import sys
 from pathlib import Path
-import shutil
 import logging
 from typing import Dict, List, Optional
 
+# 添加项目根目录到Python路径，便于单独运行本脚本
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_clean.document import Document, Page, Section, export_tree
+
+# 处理逻辑改变后递增，使 main_processor 中缓存的本步骤结果失效
+STAGE_VERSION = 2
+
 class TitleProcessor:
-    def __init__(self, output4_dir: Path, output5_dir: Path):
+    def __init__(self, output4_dir: Optional[Path] = None, output5_dir: Optional[Path] = None):
         self.output4_dir = output4_dir
         self.output5_dir = output5_dir
         self.groups: List[Dict] = []
         self.hierarchy: List[Dict] = []
+        self.outline = Section('')
         self.special_cases = {
         }
 
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('title_processor.log'),
-                logging.StreamHandler()
-            ]
-        )
         self.logger = logging.getLogger(__name__)
 
     def clean_title(self, title: str) -> str:
@@ -163,91 +164,97 @@ class TitleProcessor:
             else:
                 curr['title_info']['level'] = prev['title_info']['level']
 
-    def process_groups(self) -> None:
-        group_dirs = sorted(
-            (d for d in (self.output4_dir / 'page_1').glob('group_*') if d.name != 'group_0'),
-            key=lambda x: int(x.name.split('_')[-1])
-        )
+    def title_block(self, group):
+        """group 中的标题文本条目（文件名含 title）"""
+        return next((b for b in group.glob('*title*') if b.is_text), None)
+
+    def process_groups(self, page: Page) -> None:
+        groups = [g for g in page.sorted_groups() if g.name != 'group_0']
         
-        for group_dir in group_dirs:
-            if not (title_files := list(group_dir.glob('*title*'))):
-                self.logger.warning(f"跳过 {group_dir.name}（无标题文件）")
+        for group in groups:
+            if not (title_block := self.title_block(group)):
+                self.logger.warning(f"跳过 {group.name}（无标题文件）")
                 continue
                 
             try:
-                with open(title_files[0], 'r', encoding='utf-8') as f:
-                    title_info = self.parse_title(f.read())
+                title_info = self.parse_title(title_block.text)
                 
                 self.groups.append({
-                    'dir': group_dir,
+                    'group': group,
+                    'title': title_block,
                     'title_info': title_info,
-                    'has_merged': (group_dir / 'merged_text.txt').exists()
+                    'merged_text': group.get('merged_text.txt')
                 })
-                self.logger.info(f"处理 {group_dir.name}: {title_info['cleaned']}")
+                self.logger.info(f"处理 {group.name}: {title_info['cleaned']}")
             except Exception as e:
-                self.logger.error(f"处理 {title_files[0]} 出错: {str(e)}")
+                self.logger.error(f"处理 {title_block.name} 出错: {str(e)}")
 
         self.infer_hierarchy()
         self.hierarchy = self.groups.copy()
 
-    def process_article_title(self) -> None:
-        group_0_dir = self.output4_dir / 'page_1' / 'group_0'
-        if not group_0_dir.exists():
+    def process_article_title(self, page: Page) -> None:
+        group_0 = page.groups.get('group_0')
+        if group_0 is None:
             return
             
-        if not (title_files := list(group_0_dir.glob('*title*'))):
+        if not (title_block := self.title_block(group_0)):
             return
             
-        article_dir = self.output5_dir / "文章标题"
-        article_dir.mkdir(exist_ok=True)
-        
-        try:
-            shutil.copy(title_files[0], article_dir / 'title.txt')
-            if (merged_file := group_0_dir / 'merged_text.txt').exists():
-                shutil.copy(merged_file, article_dir / 'merged_text.txt')
-            self.logger.info(f"保存文章标题到: {article_dir}")
-        except Exception as e:
-            self.logger.error(f"处理文章标题出错: {str(e)}")
+        article = self.outline.child("文章标题")
+        article.put(title_block.renamed('title.txt'))
+        if merged := group_0.get('merged_text.txt'):
+            article.put(merged)
+        self.logger.info("保存文章标题")
 
     def create_output_structure(self) -> None:
-        level_dirs = {1: self.output5_dir}
+        level_sections = {1: self.outline}
         
         for group in self.hierarchy:
             info = group['title_info']
-            parent = level_dirs.get(info['level'] - 1, self.output5_dir)
+            parent = level_sections.get(info['level'] - 1, self.outline)
             
             safe_name = re.sub(r'[\\/*?:"<>|]', '_', info['cleaned'])
-            current_dir = parent / safe_name
+            current = parent.child(safe_name)
+            self.logger.info(f"创建章节: {safe_name} (层级 {info['level']})")
             
-            try:
-                current_dir.mkdir(exist_ok=True)
-                self.logger.info(f"创建目录: {current_dir} (层级 {info['level']})")
-                
-                shutil.copy(next(group['dir'].glob('*title*')), current_dir / 'title.txt')
-                if group['has_merged']:
-                    shutil.copy(group['dir'] / 'merged_text.txt', current_dir / 'merged_text.txt')
-                
-                level_dirs[info['level']] = current_dir
-                for l in range(info['level'] + 1, 5):
-                    level_dirs.pop(l, None)
-            except Exception as e:
-                self.logger.error(f"创建目录失败: {current_dir} - {str(e)}")
+            current.put(group['title'].renamed('title.txt'))
+            if group['merged_text']:
+                current.put(group['merged_text'])
+            
+            level_sections[info['level']] = current
+            for l in range(info['level'] + 1, 5):
+                level_sections.pop(l, None)
+
+    def process(self, document: Document) -> Section:
+        """由跨页合并后的 Document 构建章节大纲，返回根 Section（对应原 output5）"""
+        page = document.pages.get('page_1', Page('page_1'))
+        self.process_article_title(page)
+        self.process_groups(page)
+        self.create_output_structure()
+        return self.outline
 
     def run(self) -> None:
         self.logger.info(f"开始处理目录: {self.output4_dir}")
-        self.output5_dir.mkdir(exist_ok=True, parents=True)
-        
-        if self.output5_dir.exists():
-            self.logger.warning("清空输出目录")
-            shutil.rmtree(self.output5_dir)
-            self.output5_dir.mkdir()
-        
-        self.process_article_title()
-        self.process_groups()
-        self.create_output_structure()
+        outline = self.process(Document.from_directory(self.output4_dir))
+        self.logger.warning("清空输出目录")
+        export_tree(outline, self.output5_dir)
         self.logger.info(f"处理完成！输出目录: {self.output5_dir}")
 
+def classify_titles(output4_dir: Path, output5_dir: Path) -> None:
+    """按标题编号推断章节层级，生成大纲目录树，output4_dir -> output5_dir"""
+    processor = TitleProcessor(output4_dir=Path(output4_dir), output5_dir=Path(output5_dir))
+    processor.run()
+
 def main():
+    # 单独运行时才配置日志；作为 main_processor 的步骤导入时沿用调用方的日志配置
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('title_processor.log'),
+            logging.StreamHandler()
+        ]
+    )
     try:
         # base_dir = Path(__file__).parent.parent
         base_dir = Path(__file__).parent
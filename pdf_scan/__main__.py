@@ -0,0 +1,66 @@
+import argparse
+import sys
+from pathlib import Path
+from typing import List
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from pdf_scan.scan_pdf import extract_blocks_from_pdfs, VIZ_MODES, OCR_LANG
+
+
+def collect_pdfs(inputs: List[str]) -> List[str]:
+    """展开命令行输入：目录下的PDF按文件名排序加入，单个文件原样加入"""
+    pdf_paths = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            pdf_paths.extend(str(p) for p in sorted(path.glob("*.pdf")))
+        else:
+            pdf_paths.append(str(path))
+    return pdf_paths
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m pdf_scan", description="批量扫描PDF，提取版面区块")
+    parser.add_argument("inputs", nargs="+", help="PDF文件或包含PDF的目录")
+    parser.add_argument("-o", "--output", default="scan_output", help="输出根目录，每份PDF一个子目录")
+    parser.add_argument("--workers", type=int, default=1, help="共享进程池的工作进程数")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--padding", type=int, default=15)
+    parser.add_argument("--ocr-mode", choices=("block", "page"), default="block")
+    parser.add_argument("--ocr-threads", type=int, default=1)
+    parser.add_argument("--ocr-lang", default=OCR_LANG, help='Tesseract语言，"auto" 时按页抽样选择')
+    parser.add_argument("--detect-dpi", type=int, default=None)
+    parser.add_argument("--detect-batch-size", type=int, default=1)
+    parser.add_argument("--figure-dpi", type=int, default=None)
+    parser.add_argument("--text-layer", action="store_true", help="优先使用PDF自带的文字层")
+    parser.add_argument("--visualize", choices=VIZ_MODES, default="off")
+    parser.add_argument("--cache-dir", default=None)
+    parser.add_argument("--page-cache-dir", default=None)
+    parser.add_argument("--async-write", action="store_true")
+    parser.add_argument("--resume", action="store_true", help="跳过上次已完成的页面")
+    args = parser.parse_args()
+
+    pdf_paths = collect_pdfs(args.inputs)
+    if not pdf_paths:
+        print("没有找到PDF文件")
+        return 1
+
+    def report(pdf_path: str, event: dict) -> None:
+        print(f"{Path(pdf_path).name}: {event['done']}/{event['total_pages']}")
+
+    results, errors = extract_blocks_from_pdfs(
+        pdf_paths, args.output, workers=args.workers, progress_callback=report,
+        dpi=args.dpi, padding=args.padding, ocr_mode=args.ocr_mode, ocr_lang=args.ocr_lang,
+        ocr_threads=args.ocr_threads,
+        detect_dpi=args.detect_dpi, detect_batch_size=args.detect_batch_size,
+        figure_dpi=args.figure_dpi, text_layer=args.text_layer, visualize=args.visualize,
+        cache_dir=args.cache_dir, page_cache_dir=args.page_cache_dir,
+        async_write=args.async_write, resume=args.resume)
+    print(f"完成 {len(results)} 份，失败 {len(errors)} 份")
+    for pdf_path, error in errors.items():
+        print(f"  {pdf_path}: {error}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from pdf_scan.scan_cache import file_sha256
+
+# 每个 page_N 目录下的完成标记
+MARKER_NAME = ".scan_complete.json"
+
+
+def write_page_marker(page_dir: str, scan_key: str, record: Dict) -> None:
+    """页面全部文件写完后记录完成标记：扫描键、页面记录以及各输出文件的哈希"""
+    page_path = Path(page_dir)
+    files = {}
+    for group in record["groups"]:
+        group_dir = page_path / group["name"]
+        for item in sorted(group_dir.iterdir()):
+            if item.is_file():
+                files[f"{group['name']}/{item.name}"] = file_sha256(str(item))
+    marker = {"scan_key": scan_key, "record": record, "files": files}
+    # 先写临时文件再改名，中途崩溃不会留下半个标记
+    tmp_path = page_path / (MARKER_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(marker, f, ensure_ascii=False)
+    os.replace(tmp_path, page_path / MARKER_NAME)
+
+
+def load_completed_page(page_dir: str, scan_key: str) -> Optional[Dict]:
+    """页面已由同一份PDF、同一组参数完整处理且输出文件未被改动时返回页面记录，否则返回None"""
+    page_path = Path(page_dir)
+    try:
+        with open(page_path / MARKER_NAME, "r", encoding="utf-8") as f:
+            marker = json.load(f)
+        if marker["scan_key"] != scan_key:
+            return None
+        for rel_path, digest in marker["files"].items():
+            if file_sha256(str(page_path / rel_path)) != digest:
+                return None
+    except (OSError, ValueError, KeyError):
+        return None
+    return marker["record"]
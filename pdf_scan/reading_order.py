@@ -0,0 +1,113 @@
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+# 发现跨栏区块后重新分列的最多轮数；实际页面一般一轮即可稳定，上限保证整体仍为 O(n log n)
+MAX_PASSES = 3
+
+
+def _groups(ids: np.ndarray) -> Iterator[np.ndarray]:
+    """按编号分组的下标（编号从小到大），一次稳定排序加 np.split 完成"""
+    order = np.argsort(ids, kind="stable")
+    return iter(np.split(order, np.flatnonzero(np.diff(ids[order])) + 1))
+
+
+def _centre_clusters(cx: np.ndarray, min_gap: float) -> np.ndarray:
+    """按区块中心x坐标聚类：相邻中心的间隙超过 min_gap 处分开，类号从左到右递增"""
+    order = np.argsort(cx, kind="stable")
+    starts_new = np.concatenate([[False], np.diff(cx[order]) > min_gap])
+    ids = np.empty(len(cx), dtype=int)
+    ids[order] = np.cumsum(starts_new)
+    return ids
+
+
+def _cores(x1: np.ndarray, x2: np.ndarray, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """各类的主体范围：左右边界分别取中位数，个别伸出的区块不影响栏间空白的位置"""
+    groups = list(_groups(ids))
+    return (np.array([np.median(x1[g]) for g in groups]),
+            np.array([np.median(x2[g]) for g in groups]))
+
+
+def column_ids(x1: np.ndarray, x2: np.ndarray, min_gap: float, tolerance: float,
+               straddle_ratio: float) -> np.ndarray:
+    """把一个横带内的区块分列，列号从左到右递增，横跨栏间空白的区块返回 -1
+    先按中心坐标的间隙聚类：主体范围与相邻类重叠的类属于同一列（如栏内靠左的短标题），
+    主体同时压住左右两侧相邻类的类（如居中于栏间的插图）视为跨栏，去掉后重新聚类（最多 MAX_PASSES 轮）；
+    每轮排序一次，O(n log n)"""
+    ids = np.full(len(x1), -1, dtype=int)
+    keep = np.arange(len(x1))
+    for _ in range(MAX_PASSES):
+        clusters = _centre_clusters((x1[keep] + x2[keep]) / 2, min_gap)
+        left, right = _cores(x1[keep], x2[keep], clusters)
+        # joined[c]：第c类与第c+1类的主体重叠超过容差，两者之间没有栏间空白
+        joined = right[:-1] - left[1:] > tolerance
+        straddling = np.flatnonzero(np.concatenate([[False], joined]) & np.concatenate([joined, [False]]))
+        if straddling.size == 0:
+            break
+        keep = keep[~np.isin(clusters, straddling)]
+    else:
+        # 轮数用尽时按最后一次去掉跨栏类之后的结果分列
+        clusters = _centre_clusters((x1[keep] + x2[keep]) / 2, min_gap)
+        left, right = _cores(x1[keep], x2[keep], clusters)
+        joined = right[:-1] - left[1:] > tolerance
+
+    # 合并没有栏间空白隔开的相邻类，得到最终的列
+    column = np.concatenate([[0], np.cumsum(~joined)])[clusters]
+    ids[keep] = column
+    last = column.max()
+    if last == 0:
+        return ids
+
+    # 单个区块伸入相邻两列的主体都超过 straddle_ratio 时同样视为跨栏；
+    # 区块按中心归入第c列，只需检查它与第c-1、c+1列之间的两条栏间空白
+    left, right = _cores(x1[keep], x2[keep], column)
+    bx1, bx2 = x1[keep], x2[keep]
+
+    def deep(c: np.ndarray) -> np.ndarray:
+        share = (np.minimum(bx2, right[c]) - np.maximum(bx1, left[c])) / np.maximum(right[c] - left[c], 1.0)
+        return share > straddle_ratio
+
+    own = deep(column)
+    crosses = own & (((column > 0) & deep(np.maximum(column - 1, 0))) |
+                     ((column < last) & deep(np.minimum(column + 1, last))))
+    ids[keep[crosses]] = -1
+    return ids
+
+
+def sort_blocks(blocks: Sequence, image_width: int, spanning_ratio: float = 0.6, column_gap: float = 0.15,
+                gap_tolerance: float = 0.01, straddle_ratio: float = 0.25) -> List:
+    """按阅读顺序排序区块，支持任意列数及横跨多列的区块
+    宽度超过 spanning_ratio 倍页宽或横跨栏间空白的区块视为跨栏，它们把页面切成若干横带；
+    每个横带内按区块中心分列（中心间隙超过 column_gap 倍页宽处分开），列从左到右、列内从上到下
+    每轮划分横带并分列都是 O(n log n)，轮数不超过 MAX_PASSES"""
+    blocks = list(blocks)
+    if not blocks:
+        return blocks
+    coords = np.array([[b.block.x_1, b.block.y_1, b.block.x_2, b.block.y_2] for b in blocks], dtype=float)
+    x1, y1, x2, y2 = coords.T
+    cy = (y1 + y2) / 2
+    spanning = (x2 - x1) >= spanning_ratio * image_width
+
+    for _ in range(MAX_PASSES):
+        # 横带编号：非跨栏区块上方的跨栏区块数量；第k个跨栏区块排在第k个横带之后
+        span_idx = np.flatnonzero(spanning)
+        span_cy = np.sort(cy[span_idx])
+        band = np.searchsorted(span_cy, cy) * 2
+        band[span_idx] = np.searchsorted(span_cy, cy[span_idx]) * 2 + 1
+
+        # 每个横带内单独分列（不同横带的列结构可以不同）
+        column = np.zeros(len(blocks), dtype=int)
+        normal = np.flatnonzero(~spanning)
+        if normal.size:
+            for group in _groups(band[normal]):
+                idx = normal[group]
+                column[idx] = column_ids(x1[idx], x2[idx], column_gap * image_width,
+                                         gap_tolerance * image_width, straddle_ratio)
+        # 新发现的跨栏区块会切分横带，重新划分后再分列
+        if not (column < 0).any():
+            break
+        spanning |= column < 0
+
+    # 轮数用尽时仍未并入跨栏的区块列号为 -1，留在所在横带并排在最前
+    order = np.lexsort((y1, column, band))
+    return [blocks[i] for i in order]
@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 缓存格式变化时递增，使旧条目自动失效
+CACHE_VERSION = 1
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """分块计算文件的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def directory_size(path: Path) -> int:
+    """目录下所有文件的总字节数"""
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def evict_lru(cache_dir: Path, meta_name: str, max_bytes: int, target_bytes: Optional[int] = None) -> int:
+    """缓存条目总大小超过 max_bytes 时，按元数据文件的修改时间从最久未使用的条目开始删除，
+    直到不超过 target_bytes（默认等于 max_bytes）
+    每个条目是 cache_dir 下的一个目录，元数据文件 meta_name 中记录条目大小（size）；
+    返回淘汰后剩余条目的总大小"""
+    entries = []
+    for entry in cache_dir.iterdir():
+        meta_path = entry / meta_name
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                size = json.load(f).get("size")
+            if size is None:
+                size = directory_size(entry)
+            entries.append((meta_path.stat().st_mtime, size, entry))
+        except (OSError, ValueError, AttributeError):
+            continue
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return total
+    target_bytes = max_bytes if target_bytes is None else target_bytes
+    for _, size, entry in sorted(entries, key=lambda e: e[0]):
+        if total <= target_bytes:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+    return total
+
+
+class LruBudget:
+    """缓存目录的大小预算：累加新写入条目的大小得到总大小的估计值，
+    只有估计值超过上限时才读取全部元数据文件并按LRU淘汰（见 evict_lru）；
+    淘汰到上限的 low_water 倍为止，缓存写满后也不会每次写入都重新扫描
+
+    初值在首次写入时（或调用 evict 时）扫描得到。多个进程共用同一目录时各自只累加
+    本进程写入的条目，估计值偏小的部分在下一次扫描时纠正
+    """
+
+    def __init__(self, cache_dir: Path, meta_name: str, max_bytes: int, low_water: float = 0.9):
+        self.cache_dir = cache_dir
+        self.meta_name = meta_name
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.total: Optional[int] = None
+
+    def add(self, size: int) -> None:
+        """记录一个已写入的条目"""
+        if self.total is not None and self.total + size <= self.max_bytes:
+            self.total += size
+        else:
+            self.evict()
+
+    def evict(self) -> None:
+        self.total = evict_lru(self.cache_dir, self.meta_name, self.max_bytes,
+                               int(self.max_bytes * self.low_water))
+
+
+def document_key(pdf_path: str, params: Dict) -> str:
+    """由PDF内容与扫描参数生成文档级的键"""
+    digest = hashlib.sha256()
+    digest.update(file_sha256(pdf_path).encode())
+    digest.update(json.dumps({"version": CACHE_VERSION, "params": params},
+                             sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class ScanCache:
+    """按PDF内容哈希与扫描参数缓存整份文档的扫描结果
+
+    每个条目是一个目录：各 page_N 子目录（只含 manifest 中记录的 group_M 及 original.png）
+    加上记录每页区块布局与识别文字的 manifest.json。条目总大小超过 max_bytes 时
+    按最近使用时间（LRU）淘汰最旧的条目
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 2 << 30):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.budget = LruBudget(self.cache_dir, "manifest.json", max_bytes)
+
+    def key(self, pdf_path: str, params: Dict) -> str:
+        """由PDF内容与扫描参数生成缓存键"""
+        return document_key(pdf_path, params)
+
+    def load(self, key: str, output_dir: str) -> Optional[List[Dict]]:
+        """命中时把缓存的页面目录复制到 output_dir 并返回各页记录，未命中返回None"""
+        entry = self.cache_dir / key
+        manifest_path = entry / "manifest.json"
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            for page in manifest["pages"]:
+                page_name = f"page_{page['page']}"
+                target = Path(output_dir) / page_name
+                if target.exists():
+                    shutil.rmtree(target)
+                shutil.copytree(entry / page_name, target)
+            # 更新访问时间，供LRU淘汰使用
+            os.utime(manifest_path)
+        except (OSError, ValueError, KeyError):
+            # 条目不存在、损坏或正被淘汰时按未命中处理
+            return None
+        return manifest["pages"]
+
+    def store(self, key: str, output_dir: str, pages: List[Dict]) -> None:
+        """保存一次扫描的结果，估计的总大小超过上限时淘汰最久未使用的条目
+        每页只复制记录中的分组目录，输出目录里上次扫描遗留的其他 group_M 不进入缓存；
+        先写入临时目录再改名，避免留下不完整的条目"""
+        entry = self.cache_dir / key
+        if entry.exists():
+            return
+        tmp_dir = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp_"))
+        try:
+            for page in pages:
+                page_name = f"page_{page['page']}"
+                source, target = Path(output_dir) / page_name, tmp_dir / page_name
+                target.mkdir()
+                for group in page["groups"]:
+                    shutil.copytree(source / group["name"], target / group["name"])
+                if (source / "original.png").exists():
+                    shutil.copy2(source / "original.png", target / "original.png")
+            size = directory_size(tmp_dir)
+            with open(tmp_dir / "manifest.json", "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "size": size, "pages": pages}, f, ensure_ascii=False)
+            os.replace(tmp_dir, entry)
+        except OSError:
+            # 并发写入同一条目或磁盘异常时放弃本次缓存，不影响扫描结果
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        self.budget.add(size)
+
+
+class PageCache:
+    """按光栅化页面内容与模型配置缓存单页的检测与识别结果
+
+    修改过个别页面的PDF只需重新处理变化的页面。条目总大小超过 max_bytes 时
+    按最近使用时间（LRU）淘汰最旧的条目
+    """
+
+    def __init__(self, cache_dir: str, params: Dict, max_bytes: int = 2 << 30):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.params = params
+        self.budget = LruBudget(self.cache_dir, "meta.json", max_bytes)
+        # 创建时扫描一次得到总大小的初值，分发到工作进程的副本无需各自重新扫描
+        self.budget.evict()
+
+    def key(self, image_cv) -> str:
+        """由页面像素、尺寸与扫描参数生成缓存键"""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps({"version": CACHE_VERSION, "params": self.params,
+                                  "shape": list(image_cv.shape)}, sort_keys=True, default=str).encode())
+        digest.update(memoryview(image_cv).cast("B") if image_cv.flags.c_contiguous else image_cv.tobytes())
+        return digest.hexdigest()
+
+    def contains(self, key: str) -> bool:
+        """判断是否已缓存该页面"""
+        return (self.cache_dir / key / "meta.json").exists()
+
+    def load(self, key: str, page_dir: str) -> Optional[Dict]:
+        """命中时把缓存的分组目录复制到 page_dir 并返回页面记录，未命中返回None"""
+        entry = self.cache_dir / key
+        meta_path = entry / "meta.json"
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            for group in meta["record"]["groups"]:
+                target = Path(page_dir) / group["name"]
+                if target.exists():
+                    shutil.rmtree(target)
+                shutil.copytree(entry / group["name"], target)
+            # 更新访问时间，供LRU淘汰使用
+            os.utime(meta_path)
+        except (OSError, ValueError, KeyError):
+            # 条目不存在、损坏或正被淘汰时按未命中处理
+            return None
+        return meta["record"]
+
+    def store(self, key: str, page_dir: str, record: Dict) -> None:
+        """保存单页结果，估计的总大小超过上限时淘汰最久未使用的条目"""
+        entry = self.cache_dir / key
+        if entry.exists():
+            return
+        tmp_dir = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp_"))
+        try:
+            size = 0
+            for group in record["groups"]:
+                shutil.copytree(Path(page_dir) / group["name"], tmp_dir / group["name"])
+                size += sum(p.stat().st_size for p in (tmp_dir / group["name"]).iterdir())
+            with open(tmp_dir / "meta.json", "w", encoding="utf-8") as f:
+                json.dump({"size": size, "record": record}, f, ensure_ascii=False)
+            os.replace(tmp_dir, entry)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        self.budget.add(size)
+
+    def evict(self) -> None:
+        """总大小超过上限时，从最久未使用的条目开始删除"""
+        self.budget.evict()
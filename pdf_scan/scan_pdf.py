@@ -1,12 +1,24 @@
 import cv2
 import layoutparser as lp
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 import pytesseract
 import os
+import sys
 import numpy as np
 import platform
+import re
+import threading
+import time
+from contextlib import contextmanager
+from collections import Counter
+import subprocess
+from xml.etree import ElementTree
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterator, Optional, Callable
+from PIL import Image
 
 # 设置Tesseract路径
 if platform.system() == "Windows":
@@ -17,25 +29,56 @@ else:
 # 获取当前脚本所在目录
 current_directory = Path(__file__).resolve().parent
 
+# 添加项目根目录到Python路径
+sys.path.append(str(current_directory.parent))
+from pdf_scan.scan_cache import ScanCache, PageCache, document_key
+from pdf_scan.checkpoint import write_page_marker, load_completed_page
+from pdf_scan.writer import FileWriter, BackgroundWriter, write_image_file
+from pdf_scan.scan_result import ScanResult
+from pdf_scan.reading_order import sort_blocks
+
 # 构建绝对路径
 config_path = current_directory / "config.yml"
 model_path = current_directory / "model_final.pth"
 
-# 加载模型
-model = lp.Detectron2LayoutModel(
-    config_path=str(config_path),
-    model_path=str(model_path),
-    label_map={0: "Text", 1: "Title", 2: "List", 3: "Table", 4: "Figure"},
-    extra_config=["MODEL.ROI_HEADS.SCORE_THRESH_TEST", 0.8]
-)
-
-def sort_blocks(blocks: List[lp.TextBlock], image_width: int) -> List[lp.TextBlock]:
-    """按左右分列并从上到下排序区块"""
-    # 计算图像的中线
-    mid_line = image_width / 2
-    
-    # 先按列排序（左列优先），然后按 y_1 排序
-    return sorted(blocks, key=lambda b: (0 if b.block.x_1 < mid_line else 1, b.block.y_1))
+LABEL_MAP = {0: "Text", 1: "Title", 2: "List", 3: "Table", 4: "Figure"}
+SCORE_THRESH = 0.8
+OCR_LANG = "eng+chi_sim"
+# ocr_lang="auto" 时，抽样结果不含中文则只用英文模型识别本页
+OCR_LANG_LATIN = "eng"
+CJK_PATTERN = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]")
+# 需要提取文字的区块类型
+OCR_TYPES = ("Title", "Text", "List")
+# 作为图片导出、可按 figure_dpi 调整分辨率的区块类型
+FIGURE_TYPES = ("Figure", "Table")
+
+# 布局可视化模式：on 每页绘制；off 不绘制；sampled 每 viz_every 页绘制一页；
+# async 每页绘制，交给本次扫描的后台写出器（BackgroundWriter）执行
+VIZ_MODES = ("on", "off", "sampled", "async")
+
+# 布局模型在首次使用时才加载，进程内共享同一个实例
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_layout_model() -> lp.Detectron2LayoutModel:
+    """获取进程内共享的布局模型，首次调用时加载权重"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = lp.Detectron2LayoutModel(
+                    config_path=str(config_path),
+                    model_path=str(model_path),
+                    label_map=LABEL_MAP,
+                    extra_config=["MODEL.ROI_HEADS.SCORE_THRESH_TEST", SCORE_THRESH]
+                )
+    return _model
+
+
+def warm_up_model() -> None:
+    """预先加载布局模型，可在应用空闲时调用以避免首次扫描的等待"""
+    get_layout_model()
 
 
 def group_by_title(blocks: List[lp.TextBlock]) -> List[Dict]:
@@ -68,80 +111,725 @@ def group_by_title(blocks: List[lp.TextBlock]) -> List[Dict]:
 
 
 
-def extract_blocks_from_pdf(pdf_path: str, output_dir: str, dpi: int = 300, padding: int = 15):
-    images = convert_from_path(pdf_path, dpi=dpi)
-    os.makedirs(output_dir, exist_ok=True)
+def page_runs(page_nums: List[int], size: int) -> List[List[int]]:
+    """把页码切分为若干段连续页码，每段不超过size页，便于用 first_page/last_page 一次光栅化"""
+    runs: List[List[int]] = []
+    for page_num in page_nums:
+        if runs and page_num == runs[-1][-1] + 1 and len(runs[-1]) < size:
+            runs[-1].append(page_num)
+        else:
+            runs.append([page_num])
+    return runs
+
+
+def iter_pdf_pages(pdf_path: str, dpi: int = 300, window: int = 1,
+                   page_nums: Optional[List[int]] = None,
+                   timings: Optional[Dict[int, float]] = None) -> Iterator[Tuple[int, Image.Image]]:
+    """按窗口逐批光栅化PDF页面（页码从1开始），内存中最多只保留window页
+    page_nums 不为空时只光栅化其中的页面；timings 不为空时记录每页的光栅化耗时（秒），
+    每次转换的耗时由实际渲染出的页面平分"""
+    if page_nums is None:
+        page_nums = list(range(1, pdfinfo_from_path(pdf_path)["Pages"] + 1))
+    for run in page_runs(page_nums, max(1, window)):
+        start = time.perf_counter()
+        images = convert_from_path(pdf_path, dpi=dpi, first_page=run[0], last_page=run[-1])
+        if timings is not None:
+            seconds = (time.perf_counter() - start) / max(1, len(images))
+            timings.update((page_num, seconds) for page_num in run[:len(images)])
+        for page_num, image in zip(run, images):
+            yield page_num, image
+
+
+def page_to_array(image: Image.Image) -> np.ndarray:
+    """将PIL页面直接转换为RGB numpy数组，避免PNG落盘再读回"""
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.asarray(image)
+
+
+def padded_box(block: lp.TextBlock, padding: int, width: int, height: int) -> Tuple[int, int, int, int]:
+    """计算区块加上padding并裁剪到页面范围内的坐标"""
+    x1, y1, x2, y2 = map(int, [block.block.x_1, block.block.y_1,
+                               block.block.x_2, block.block.y_2])
+    return max(0, x1 - padding), max(0, y1 - padding), min(width, x2 + padding), min(height, y2 + padding)
+
+
+def crop_block(image_cv: np.ndarray, block: lp.TextBlock, padding: int) -> np.ndarray:
+    """从页面图像中裁剪出区块"""
+    h, w = image_cv.shape[:2]
+    x1, y1, x2, y2 = padded_box(block, padding, w, h)
+    return image_cv[y1:y2, x1:x2]
+
+
+def render_clip(pdf_path: str, page_num: int, box: Tuple[int, int, int, int], render_dpi: int,
+                png_path: str) -> None:
+    """用 pdftoppm 以指定分辨率只渲染页面中的一块区域并直接写出PNG，box 为 render_dpi 下的像素坐标"""
+    x1, y1, x2, y2 = box
+    subprocess.run(
+        ["pdftoppm", "-f", str(page_num), "-l", str(page_num), "-r", str(render_dpi),
+         "-x", str(x1), "-y", str(y1), "-W", str(max(1, x2 - x1)), "-H", str(max(1, y2 - y1)),
+         "-png", "-singlefile", pdf_path, os.path.splitext(png_path)[0]],
+        check=True, capture_output=True
+    )
+
+
+def write_figure(writer: FileWriter, png_path: str, image_cv: np.ndarray, block: lp.TextBlock,
+                 padding: int, dpi: int, figure_dpi: int, page_num: int,
+                 pdf_path: Optional[str] = None) -> None:
+    """按目标分辨率导出图片/表格区块
+    figure_dpi 低于扫描分辨率时直接缩小裁剪结果；高于扫描分辨率且有 pdf_path 时从PDF重新渲染该区域"""
+    h, w = image_cv.shape[:2]
+    box = padded_box(block, padding, w, h)
+    scale = figure_dpi / dpi
+    if scale > 1 and pdf_path:
+        clip = tuple(round(v * scale) for v in box)
+
+        def render_or_crop():
+            try:
+                render_clip(pdf_path, page_num, clip, figure_dpi, png_path)
+            except (OSError, subprocess.CalledProcessError):
+                # pdftoppm 不可用时退回扫描分辨率的裁剪；本函数已在写出任务中执行，直接写文件
+                write_image_file(png_path, image_cv[box[1]:box[3], box[0]:box[2]])
+
+        writer.submit(render_or_crop)
+        return
+
+    crop = image_cv[box[1]:box[3], box[0]:box[2]]
+    if scale < 1 and crop.size:
+        crop = cv2.resize(crop, (max(1, round(crop.shape[1] * scale)), max(1, round(crop.shape[0] * scale))),
+                          interpolation=cv2.INTER_AREA)
+    writer.write_image(png_path, crop)
+
+
+def words_in_boxes(cx: np.ndarray, cy: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """返回布尔矩阵 inside[i, j]：第i个单词的中心是否落在第j个区块内
+    与逐块裁剪一样，落在重叠区域的单词归入所有相关区块"""
+    return ((cx[:, None] >= boxes[None, :, 0]) & (cx[:, None] < boxes[None, :, 2]) &
+            (cy[:, None] >= boxes[None, :, 1]) & (cy[:, None] < boxes[None, :, 3]))
+
+
+def read_text_layer(pdf_path: str, page_num: int, width: int, height: int) -> List[List[Tuple[str, float, float]]]:
+    """用 poppler 的 pdftotext -bbox-layout 读取页面自带的文字层
+    返回按阅读顺序排列的行，每行为 (单词, 中心x, 中心y)，坐标已换算为页面图像像素；
+    没有文字层或 pdftotext 不可用时返回空列表"""
+    try:
+        result = subprocess.run(
+            ["pdftotext", "-bbox-layout", "-f", str(page_num), "-l", str(page_num), pdf_path, "-"],
+            check=True, capture_output=True
+        )
+        root = ElementTree.fromstring(result.stdout)
+    except (OSError, subprocess.CalledProcessError, ElementTree.ParseError) as e:
+        print(f"无法读取文字层，page {page_num}: {e}")
+        return []
+
+    lines = []
+    for page in root.iterfind(".//{*}page"):
+        sx = width / float(page.get("width"))
+        sy = height / float(page.get("height"))
+        for line in page.iterfind(".//{*}line"):
+            words = []
+            for word in line.iterfind("{*}word"):
+                if word.text and word.text.strip():
+                    x = (float(word.get("xMin")) + float(word.get("xMax"))) / 2 * sx
+                    y = (float(word.get("yMin")) + float(word.get("yMax"))) / 2 * sy
+                    words.append((word.text, x, y))
+            if words:
+                lines.append(words)
+    return lines
+
+
+def text_from_layer(lines: List[List[Tuple[str, float, float]]], blocks: List[lp.TextBlock],
+                    padding: int, width: int, height: int) -> List[str]:
+    """按坐标把文字层中的单词分配给各区块，没有分到文字的区块返回空字符串"""
+    texts = [[] for _ in blocks]
+    if not lines or not blocks:
+        return ["" for _ in blocks]
+    boxes = np.array([padded_box(b, padding, width, height) for b in blocks])
+    for line in lines:
+        inside = words_in_boxes(np.array([w[1] for w in line]), np.array([w[2] for w in line]), boxes)
+        for j in np.flatnonzero(inside.any(axis=0)):
+            texts[j].append(" ".join(line[i][0] for i in np.flatnonzero(inside[:, j])))
+    return ["\n".join(t) for t in texts]
+
+
+def ocr_page_once(image_cv: np.ndarray, blocks: List[lp.TextBlock], padding: int,
+                  ocr_lang: str = OCR_LANG) -> List[str]:
+    """整页只调用一次Tesseract，再按单词中心点把结果映射回各区块"""
+    if not blocks:
+        return []
+    h, w = image_cv.shape[:2]
+    boxes = np.array([padded_box(b, padding, w, h) for b in blocks])
+
+    # 只保留待识别区块的像素，其余区域涂白，避免识别图表等无关内容
+    masked = np.full_like(image_cv, 255)
+    for x1, y1, x2, y2 in boxes:
+        masked[y1:y2, x1:x2] = image_cv[y1:y2, x1:x2]
+    data = pytesseract.image_to_data(masked, lang=ocr_lang, output_type=pytesseract.Output.DICT)
+
+    words = [i for i, t in enumerate(data["text"]) if t.strip()]
+    if not words:
+        return [""] * len(blocks)
+    cx = np.array([data["left"][i] + data["width"][i] / 2 for i in words])
+    cy = np.array([data["top"][i] + data["height"][i] / 2 for i in words])
+    inside = words_in_boxes(cx, cy, boxes)
+
+    texts = []
+    for j in range(len(blocks)):
+        lines: List[List[str]] = []
+        last_para, last_line = None, None
+        for i in np.flatnonzero(inside[:, j]):
+            k = words[i]
+            para = (data["block_num"][k], data["par_num"][k])
+            line = para + (data["line_num"][k],)
+            if line != last_line:
+                # 段落之间空一行，与 image_to_string 的输出保持一致
+                if last_para is not None and para != last_para:
+                    lines.append([])
+                lines.append([])
+                last_para, last_line = para, line
+            lines[-1].append(data["text"][k])
+        texts.append("\n".join(" ".join(line) for line in lines))
+    return texts
+
+
+def choose_ocr_lang(image_cv: np.ndarray, blocks: List[lp.TextBlock], padding: int) -> Tuple[str, int, str]:
+    """用组合语言识别面积最大的区块作为抽样，出现中文或抽样为空时保留组合语言，否则只用英文
+    返回 (选定语言, 抽样区块下标, 抽样区块文字)，抽样结果本身即为该区块的最终文字"""
+    sample = max(range(len(blocks)), key=lambda i: blocks[i].width * blocks[i].height)
+    text = pytesseract.image_to_string(crop_block(image_cv, blocks[sample], padding), lang=OCR_LANG)
+    if not text.strip() or CJK_PATTERN.search(text):
+        return OCR_LANG, sample, text
+    return OCR_LANG_LATIN, sample, text
+
+
+def ocr_blocks(image_cv: np.ndarray, blocks: List[lp.TextBlock], padding: int,
+               ocr_mode: str = "block", ocr_threads: int = 1, ocr_lang: str = OCR_LANG) -> List[str]:
+    """识别区块文字。block：每个区块单独调用Tesseract；page：整页只调用一次
+    ocr_threads 大于1时，block 模式下用线程池并发等待各个Tesseract子进程，结果顺序不变；
+    ocr_lang 为 "auto" 时按 choose_ocr_lang 的抽样结果为本页选择语言，抽样区块不再重复识别
+    （page 模式下把它从整页掩膜中去掉，其余区块用选定语言整页识别一次）"""
+    if ocr_mode not in ("block", "page"):
+        raise ValueError(f"未知的OCR模式: {ocr_mode}")
+    if not blocks:
+        return []
+    sample, sample_text = None, ""
+    if ocr_lang == "auto":
+        ocr_lang, sample, sample_text = choose_ocr_lang(image_cv, blocks, padding)
+    if ocr_mode == "page":
+        if sample is None:
+            return ocr_page_once(image_cv, blocks, padding, ocr_lang)
+        rest = [i for i in range(len(blocks)) if i != sample]
+        texts = dict(zip(rest, ocr_page_once(image_cv, [blocks[i] for i in rest], padding, ocr_lang)))
+        texts[sample] = sample_text
+        return [texts[i] for i in range(len(blocks))]
+
+    def ocr_one(i: int) -> str:
+        if i == sample:
+            return sample_text
+        return pytesseract.image_to_string(crop_block(image_cv, blocks[i], padding), lang=ocr_lang)
+
+    if ocr_threads > 1 and len(blocks) > 1:
+        with ThreadPoolExecutor(max_workers=min(ocr_threads, len(blocks))) as pool:
+            return list(pool.map(ocr_one, range(len(blocks))))
+    return [ocr_one(i) for i in range(len(blocks))]
+
+
+def _detection_input(image_cv: np.ndarray, detect_scale: float) -> np.ndarray:
+    """按 detect_scale 缩小页面图像，作为布局检测的输入"""
+    if detect_scale >= 1.0:
+        return image_cv
+    h, w = image_cv.shape[:2]
+    return cv2.resize(image_cv, (max(1, round(w * detect_scale)), max(1, round(h * detect_scale))),
+                      interpolation=cv2.INTER_AREA)
+
+
+def _rescale_layout(layout: lp.Layout, image_cv: np.ndarray, detected: np.ndarray) -> lp.Layout:
+    """把在缩小图像上得到的布局坐标换算回原图分辨率"""
+    if detected is image_cv:
+        return layout
+    h, w = image_cv.shape[:2]
+    return layout.scale((w / detected.shape[1], h / detected.shape[0]))
+
+
+def detect_layout(model: lp.Detectron2LayoutModel, image_cv: np.ndarray, detect_scale: float = 1.0) -> lp.Layout:
+    """检测页面布局；detect_scale 小于1时在缩小的图像上检测，再把坐标换算回原图分辨率"""
+    detected = _detection_input(image_cv, detect_scale)
+    return _rescale_layout(model.detect(detected), image_cv, detected)
+
+
+def detect_layout_batch(model: lp.Detectron2LayoutModel, images_cv: List[np.ndarray],
+                        detect_scale: float = 1.0) -> List[lp.Layout]:
+    """把多个页面合并为一次前向传播检测布局，结果与逐页调用 detect_layout 一一对应"""
+    predictor = model.model
+    # 预处理与 DefaultPredictor.__call__ 保持一致；无法批处理时退回逐页检测
+    if len(images_cv) <= 1 or not all(hasattr(predictor, a) for a in ("model", "aug", "input_format")):
+        return [detect_layout(model, image_cv, detect_scale) for image_cv in images_cv]
+
+    import torch
+    detected = [_detection_input(image_cv, detect_scale) for image_cv in images_cv]
+    inputs = []
+    for image in detected:
+        if predictor.input_format == "RGB":
+            image = image[:, :, ::-1]
+        height, width = image.shape[:2]
+        transformed = predictor.aug.get_transform(image).apply_image(image)
+        inputs.append({"image": torch.as_tensor(transformed.astype("float32").transpose(2, 0, 1)),
+                       "height": height, "width": width})
+    with torch.no_grad():
+        outputs = predictor.model(inputs)
+    return [_rescale_layout(model.gather_output(output), image_cv, small)
+            for output, image_cv, small in zip(outputs, images_cv, detected)]
 
-    for page_num, image in enumerate(images):
-        print(f"Processing page {page_num + 1}...")
-        page_dir = os.path.join(output_dir, f"page_{page_num + 1}")
+
+def write_layout_visualization(image_cv: np.ndarray, layout: lp.Layout, viz_path: str) -> None:
+    """绘制布局框并保存为 page_N_layout.png"""
+    viz_image = lp.draw_box(image_cv, layout, box_width=3)
+    # 确保图像是numpy数组格式
+    if not isinstance(viz_image, np.ndarray):
+        viz_image = np.asarray(viz_image)
+    # 直接从RGB保存为BGR格式
+    cv2.imwrite(viz_path, viz_image[:, :, ::-1])
+
+
+class StageTimer:
+    """累计各阶段耗时（秒），用于 progress_callback 上报"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+
+def _without_stats(record: Dict) -> Dict:
+    """去掉运行统计，只保留需要缓存的页面记录"""
+    return {k: v for k, v in record.items() if k != "stats"}
+
+
+def block_record(block: lp.TextBlock, prefix: str) -> Dict:
+    """区块的可序列化记录：文件名前缀、类型、坐标、置信度与识别文字"""
+    return {
+        "file": prefix,
+        "type": block.type,
+        "bbox": [float(v) for v in block.coordinates],
+        "score": float(block.score) if block.score is not None else None,
+        "text": block.text.strip() if block.type in OCR_TYPES and block.text else None,
+    }
+
+
+def scan_page(image: Image.Image, page_num: int, output_dir: str, model: lp.Detectron2LayoutModel,
+              padding: int = 15, save_original: bool = False, ocr_mode: str = "block",
+              ocr_threads: int = 1, page_cache: Optional[PageCache] = None,
+              detect_scale: float = 1.0, visualize: str = "on", viz_every: int = 10,
+              pdf_path: Optional[str] = None, text_layer: bool = False,
+              layout: Optional[lp.Layout] = None, image_cv: Optional[np.ndarray] = None,
+              writer: Optional[FileWriter] = None, write_files: bool = True,
+              dpi: int = 300, figure_dpi: Optional[int] = None, ocr_lang: str = OCR_LANG,
+              page_key: Optional[str] = None) -> Dict:
+    """检测并识别单个页面，结果写入 output_dir/page_N，并返回本页的区块记录
+    记录中的 stats 为本页各阶段耗时（detect/ocr/crop/write/write_background，见 page_progress_event）
+    与各类区块数量；
+    page_cache 不为空时，内容未变化的页面直接复用缓存的检测与识别结果，page_key 为已算好的缓存键；
+    detect_scale 为布局检测所用分辨率与页面分辨率之比，裁剪和OCR始终使用原分辨率；
+    visualize/viz_every 控制 page_N_layout.png 的生成方式，见 VIZ_MODES，async 时绘制作为写出任务交给 writer；
+    text_layer 为True时从 pdf_path 读取本页文字层，只对没有文字层的区块做OCR；
+    layout/image_cv 可传入已批量检测好的布局及对应的页面数组；
+    writer 负责写出裁剪图像和文本，默认同步写出；write_files 为False时只返回记录，不写出区块文件和布局图；
+    figure_dpi 不为空时图片和表格按该分辨率导出（dpi 为页面图像的分辨率）"""
+    timer = StageTimer()
+    writer = (writer or FileWriter()).for_page(timer.timings)
+    page_dir = os.path.join(output_dir, f"page_{page_num}")
+    if write_files:
         os.makedirs(page_dir, exist_ok=True)
+    else:
+        # 不落盘时页面缓存无从复制，直接跳过
+        page_cache = None
 
-        # 保存原始页面图像
-        image_path = os.path.join(page_dir, "original.png")
-        image.save(image_path, "PNG")
-        image_cv = cv2.imread(image_path)
-        image_cv = cv2.cvtColor(image_cv, cv2.COLOR_BGR2RGB)
-        h, w = image_cv.shape[:2]
-
-        # 检测布局并排序
-        layout = model.detect(image_cv)
-        sorted_blocks = sort_blocks(layout,w)
-        grouped_blocks = group_by_title(sorted_blocks)
-
-        # 可视化布局
-        # 修改后
-        viz_image = lp.draw_box(image_cv, layout, box_width=3)
-        viz_path = os.path.join(output_dir, f"page_{page_num + 1}_layout.png")
-        # 确保图像是numpy数组格式
-        if isinstance(viz_image, np.ndarray):
-            # 直接从RGB保存为BGR格式
-            cv2.imwrite(viz_path, viz_image[:, :, ::-1])  # 替代cvtColor
-        else:
-            print(f"无图像，page {page_num + 1}")
-
-        # 按分组处理内容
-        for group_idx, group in enumerate(grouped_blocks):
-            # 判断是否为无标题引导的部分
-            group_dir_name = f"group_{group_idx}" if group["title"] is None else f"group_{group_idx + 1}"
-            group_dir = os.path.join(page_dir, group_dir_name)
-            os.makedirs(group_dir, exist_ok=True)
-
-            # 保存标题（如果存在）
-            if group["title"]:
-                title = group["title"]
-                x1, y1, x2, y2 = map(int, [title.block.x_1, title.block.y_1, 
-                                        title.block.x_2, title.block.y_2])
-                title_image = image_cv[max(0,y1-padding):min(h,y2+padding), 
-                                    max(0,x1-padding):min(w,x2+padding)]
-                cv2.imwrite(os.path.join(group_dir, "00_title.png"), 
-                        cv2.cvtColor(title_image, cv2.COLOR_RGB2BGR))
-                
-                # 提取标题文本
-                title_text = pytesseract.image_to_string(title_image, lang='eng+chi_sim')
-                with open(os.path.join(group_dir, "00_title.txt"), "w", encoding="utf-8") as f:
-                    f.write(title_text.strip())
-
-            # 保存内容区块
-            for content_idx, content in enumerate(group["content"]):
-                x1, y1, x2, y2 = map(int, [content.block.x_1, content.block.y_1,
-                                        content.block.x_2, content.block.y_2])
-                content_image = image_cv[max(0,y1-padding):min(h,y2+padding),
-                                    max(0,x1-padding):min(w,x2+padding)]
-                
-                # 按类型处理
-                prefix = f"{content_idx + 1:02d}_{content.type.lower()}"
-                cv2.imwrite(os.path.join(group_dir, f"{prefix}.png"),
-                        cv2.cvtColor(content_image, cv2.COLOR_RGB2BGR))
-
-                if content.type in ["Text", "List"]:
-                    text = pytesseract.image_to_string(content_image, lang='eng+chi_sim')
-                    with open(os.path.join(group_dir, f"{prefix}.txt"), "w", encoding="utf-8") as f:
-                        f.write(text.strip())
-                elif content.type == "Table":
-                    print(f"Table saved to {group_dir}/{prefix}.png")
-                elif content.type == "Figure":
-                    print(f"Figure saved to {group_dir}/{prefix}.png") 
+    # 页面直接转为RGB数组；原始页面图像仅在需要时保存
+    if image_cv is None:
+        image_cv = page_to_array(image)
+    h, w = image_cv.shape[:2]
+    if save_original and write_files:
+        image.save(os.path.join(page_dir, "original.png"), "PNG")
+
+    if page_cache is not None:
+        page_key = page_key or page_cache.key(image_cv)
+        cached = page_cache.load(page_key, page_dir)
+        if cached is not None:
+            print(f"命中页面缓存: page {page_num}")
+            counts = Counter(b["type"] for g in cached["groups"] for b in g["blocks"])
+            return dict(cached, page=page_num, stats={"timings": timer.timings, "counts": dict(counts),
+                                                      "cached": True})
+
+    # 检测布局并排序
+    if layout is None:
+        with timer.stage("detect"):
+            layout = detect_layout(model, image_cv, detect_scale)
+    sorted_blocks = sort_blocks(layout,w)
+    grouped_blocks = group_by_title(sorted_blocks)
+
+    # 可视化布局（仅用于调试，可关闭、抽样或交给后台线程；不落盘时不绘制）
+    if visualize not in VIZ_MODES:
+        raise ValueError(f"未知的可视化模式: {visualize}")
+    if write_files:
+        viz_path = os.path.join(output_dir, f"page_{page_num}_layout.png")
+        if visualize == "on" or (visualize == "sampled" and (page_num - 1) % viz_every == 0):
+            write_layout_visualization(image_cv, layout, viz_path)
+        elif visualize == "async":
+            writer.submit(write_layout_visualization, image_cv, layout, viz_path)
+
+    # 先统一提取本页所有标题/文本/列表区块的文字，结果存入 block.text；
+    # 启用文字层时优先使用PDF自带文字，只有没有分到文字的区块才交给Tesseract
+    text_blocks = [b for b in sorted_blocks if b.type in OCR_TYPES]
+    with timer.stage("ocr"):
+        if text_layer and pdf_path:
+            lines = read_text_layer(pdf_path, page_num, w, h)
+            for block, text in zip(text_blocks, text_from_layer(lines, text_blocks, padding, w, h)):
+                block.text = text
+        ocr_targets = [b for b in text_blocks if not b.text]
+        texts = ocr_blocks(image_cv, ocr_targets, padding, ocr_mode, ocr_threads, ocr_lang)
+        for block, text in zip(ocr_targets, texts):
+            block.text = text
+
+    # 按分组处理内容，同时记录本页的区块布局与文字
+    page_record = {"page": page_num, "width": w, "height": h, "groups": []}
+    for group_idx, group in enumerate(grouped_blocks):
+        # 判断是否为无标题引导的部分
+        group_dir_name = f"group_{group_idx}" if group["title"] is None else f"group_{group_idx + 1}"
+        group_dir = os.path.join(page_dir, group_dir_name)
+        group_record = {"name": group_dir_name, "blocks": []}
+        page_record["groups"].append(group_record)
+        if group["title"]:
+            group_record["blocks"].append(block_record(group["title"], "00_title"))
+        for content_idx, content in enumerate(group["content"]):
+            group_record["blocks"].append(block_record(content, f"{content_idx + 1:02d}_{content.type.lower()}"))
+        if not write_files:
+            continue
+        os.makedirs(group_dir, exist_ok=True)
+
+        # 保存标题（如果存在）
+        if group["title"]:
+            title = group["title"]
+            with timer.stage("crop"):
+                title_image = crop_block(image_cv, title, padding)
+            with timer.stage("write"):
+                writer.write_image(os.path.join(group_dir, "00_title.png"), title_image)
+                # 保存标题文本
+                writer.write_text(os.path.join(group_dir, "00_title.txt"), title.text.strip())
+
+        # 保存内容区块
+        for content_idx, content in enumerate(group["content"]):
+            # 按类型处理
+            prefix = f"{content_idx + 1:02d}_{content.type.lower()}"
+            png_path = os.path.join(group_dir, f"{prefix}.png")
+            if figure_dpi and content.type in FIGURE_TYPES:
+                with timer.stage("write"):
+                    write_figure(writer, png_path, image_cv, content, padding, dpi, figure_dpi, page_num, pdf_path)
+            else:
+                with timer.stage("crop"):
+                    content_image = crop_block(image_cv, content, padding)
+                with timer.stage("write"):
+                    writer.write_image(png_path, content_image)
+
+            if content.type in ["Text", "List"]:
+                with timer.stage("write"):
+                    writer.write_text(os.path.join(group_dir, f"{prefix}.txt"), content.text.strip())
+            elif content.type == "Table":
+                print(f"Table saved to {group_dir}/{prefix}.png")
+            elif content.type == "Figure":
+                print(f"Figure saved to {group_dir}/{prefix}.png")
+
+    if page_cache is not None:
+        # 排在本页文件之后执行，保证缓存的是完整的页面
+        writer.submit(page_cache.store, page_key, page_dir, _without_stats(page_record))
+    page_record["stats"] = {"timings": timer.timings, "counts": dict(Counter(b.type for b in layout)),
+                            "cached": False}
+    return page_record
+
+
+def _init_scan_worker(threads_per_worker: int) -> None:
+    """工作进程初始化：限制推理线程数并加载本进程的模型副本"""
+    import torch
+    torch.set_num_threads(threads_per_worker)
+    warm_up_model()
+
+
+def make_writer(async_write: bool = False) -> FileWriter:
+    """按配置创建同步或后台写出器"""
+    return BackgroundWriter() if async_write else FileWriter()
+
+
+def scan_pages(pages: List[Tuple[int, Image.Image]], output_dir: str, model: lp.Detectron2LayoutModel,
+               pdf_path: Optional[str] = None, writer: Optional[FileWriter] = None,
+               async_write: bool = False, checkpoint_key: Optional[str] = None, **options) -> List[Dict]:
+    """处理一批页面：布局检测合并为一次前向传播，其余步骤逐页进行
+    未传入 writer 时按 async_write 为本批页面创建写出器，返回前写完；
+    checkpoint_key 不为空时每页文件写完后写入完成标记，供中断后续跑"""
+    if writer is None:
+        batch_writer = make_writer(async_write or options.get("visualize") == "async")
+        try:
+            return scan_pages(pages, output_dir, model, pdf_path=pdf_path, writer=batch_writer,
+                              checkpoint_key=checkpoint_key, **options)
+        finally:
+            batch_writer.close()
+
+    page_cache = options.get("page_cache") if options.get("write_files", True) else None
+    arrays = [page_to_array(image) for _, image in pages]
+    # 每页只计算一次缓存键，scan_page 直接复用；已有页面缓存的页面不参与检测
+    keys = [page_cache.key(image_cv) if page_cache is not None else None for image_cv in arrays]
+    todo = [i for i, key in enumerate(keys) if key is None or not page_cache.contains(key)]
+    start = time.perf_counter()
+    layouts = dict(zip(todo, detect_layout_batch(model, [arrays[i] for i in todo],
+                                                 options.get("detect_scale", 1.0))))
+    detect_seconds = (time.perf_counter() - start) / max(1, len(todo))
+    records = []
+    for i, (page_num, image) in enumerate(pages):
+        print(f"Processing page {page_num}...")
+        record = scan_page(image, page_num, output_dir, model, pdf_path=pdf_path,
+                           layout=layouts.get(i), image_cv=arrays[i], page_key=keys[i], writer=writer, **options)
+        if i in layouts:
+            # 批量检测的耗时平均分摊到参与检测的页面
+            record["stats"]["timings"]["detect"] = detect_seconds
+        if checkpoint_key and options.get("write_files", True):
+            # 排在本页文件之后执行，标记存在即代表本页输出完整
+            writer.for_page(record["stats"]["timings"]).submit(
+                write_page_marker, os.path.join(output_dir, f"page_{page_num}"), checkpoint_key, _without_stats(record))
+        records.append(record)
+    return records
+
+
+def make_scan_pool(workers: int) -> ProcessPoolExecutor:
+    """创建扫描用的进程池：每个工作进程只加载一次模型，并自行光栅化所分配的页面"""
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                               initializer=_init_scan_worker, initargs=(threads_per_worker,))
+
+
+def _scan_pages_in_worker(pdf_path: str, page_nums: List[int], output_dir: str, dpi: int,
+                          options: Dict) -> List[Dict]:
+    """在工作进程中光栅化并处理一批连续页面"""
+    start = time.perf_counter()
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_nums[0], last_page=page_nums[-1])
+    rasterize_seconds = (time.perf_counter() - start) / len(page_nums)
+    records = scan_pages(list(zip(page_nums, images)), output_dir, get_layout_model(), pdf_path=pdf_path, **options)
+    for record in records:
+        record["stats"]["timings"]["rasterize"] = rasterize_seconds
+    return records
+
+
+def scan_parameters(dpi: int, padding: int, ocr_mode: str, save_original: bool,
+                    detect_dpi: Optional[int] = None, text_layer: bool = False,
+                    figure_dpi: Optional[int] = None, ocr_lang: str = OCR_LANG) -> Dict:
+    """影响扫描结果的全部参数，用作缓存键的一部分"""
+    return {
+        "dpi": dpi,
+        "figure_dpi": figure_dpi,
+        "detect_dpi": detect_dpi,
+        "text_layer": text_layer,
+        "padding": padding,
+        "ocr_mode": ocr_mode,
+        "ocr_lang": ocr_lang,
+        "save_original": save_original,
+        "score_thresh": SCORE_THRESH,
+        "label_map": LABEL_MAP,
+        "config_path": str(config_path),
+        "model_path": str(model_path),
+        # 权重文件被替换时缓存随之失效
+        "model_stat": [model_path.stat().st_size, model_path.stat().st_mtime_ns] if model_path.exists() else None,
+    }
+
+
+def page_progress_event(record: Dict, done: int, total: int) -> Dict:
+    """进度回调的参数：页码、已完成页数、总页数、各阶段耗时（秒）、各类区块数量、是否命中缓存
+    后台写出（async_write 或 visualize="async"）时 write 只是提交任务（含队列满时等待）的耗时，
+    写出线程上实际的写盘、布局图、页面缓存与完成标记耗时记在 write_background 中；
+    这部分在任务执行后才累加到同一个 timings 字典，回调时可能尚不完整，扫描返回时已完整"""
+    stats = record.get("stats", {})
+    return {
+        "page": record["page"],
+        "done": done,
+        "total_pages": total,
+        "timings": stats.get("timings", {}),
+        "counts": stats.get("counts", {}),
+        "cached": stats.get("cached", False),
+    }
+
+
+def extract_blocks_from_pdf(pdf_path: str, output_dir: str, dpi: int = 300, padding: int = 15,
+                            page_window: int = 1, save_original: bool = False,
+                            ocr_mode: str = "block", workers: int = 1, ocr_threads: int = 1,
+                            cache_dir: Optional[str] = None, cache_max_bytes: int = 2 << 30,
+                            page_cache_dir: Optional[str] = None, page_cache_max_bytes: int = 2 << 30,
+                            detect_dpi: Optional[int] = None, visualize: str = "on",
+                            viz_every: int = 10, text_layer: bool = False,
+                            detect_batch_size: int = 1, async_write: bool = False,
+                            write_files: bool = True, figure_dpi: Optional[int] = None,
+                            progress_callback: Optional[Callable[[Dict], None]] = None,
+                            resume: bool = False,
+                            pool: Optional[ProcessPoolExecutor] = None,
+                            ocr_lang: str = OCR_LANG) -> ScanResult:
+    """逐页扫描PDF并按 page_N/group_M 写出区块，返回结构化的 ScanResult
+    page_window 控制同时驻留内存的页数；save_original 为True时额外保存 original.png；
+    ocr_mode 为 "page" 时每页只启动一次Tesseract；workers 大于1时按页分发到多进程并行处理；
+    ocr_threads 大于1时页内各区块的OCR并发执行；
+    cache_dir 不为空时按PDF内容哈希和扫描参数缓存结果，相同文件再次上传时直接复用，
+    缓存总大小不超过 cache_max_bytes；
+    page_cache_dir 不为空时另按单页内容缓存，只有变化的页面才重新检测和识别，
+    缓存总大小不超过 page_cache_max_bytes；
+    detect_dpi 小于 dpi 时布局检测在低分辨率下进行，区块坐标换算回 dpi 后再裁剪和OCR；
+    visualize 为调试用布局图的生成模式（on/off/sampled/async），sampled 时每 viz_every 页绘制一页，
+    async 时即使 async_write 为False也使用后台写出器，布局图与其他文件一起在返回前写完；
+    text_layer 为True时优先使用PDF自带的文字层（适用于非扫描件），缺少文字层的区块再做OCR；
+    detect_batch_size 大于1时每次把这么多页合并为一次布局检测的前向传播；
+    async_write 为True时裁剪图像和文本交给有界队列的后台线程写出，函数返回前全部写完；
+    write_files 为False时不创建 output_dir，也不写出 page_N/group_M 目录树和布局图，
+    只在内存中返回结果（此时不使用缓存）；
+    figure_dpi 不为空时图片和表格按该分辨率导出（如按幻灯片尺寸选择），低于 dpi 时缩小裁剪结果，
+    高于 dpi 时从PDF重新渲染该区域；
+    progress_callback 不为空时每完成一页调用一次，参数见 page_progress_event；
+    resume 为True时每页完成后写入带文件哈希的完成标记，重新运行时跳过已完成且校验通过的页面；
+    pool 不为空时页面提交到这个共享进程池（见 make_scan_pool），忽略 workers；
+    ocr_lang 为Tesseract语言，"auto" 时每页先抽样识别一个区块，不含中文则只用英文模型"""
+    if write_files:
+        os.makedirs(output_dir, exist_ok=True)
+    params = scan_parameters(dpi, padding, ocr_mode, save_original, detect_dpi, text_layer, figure_dpi, ocr_lang)
+    options = {"padding": padding, "save_original": save_original, "ocr_mode": ocr_mode,
+               "ocr_threads": ocr_threads, "detect_scale": min(1.0, detect_dpi / dpi) if detect_dpi else 1.0,
+               "visualize": visualize, "viz_every": max(1, viz_every), "text_layer": text_layer,
+               "async_write": async_write, "write_files": write_files, "dpi": dpi, "figure_dpi": figure_dpi,
+               "ocr_lang": ocr_lang}
+    if page_cache_dir and write_files:
+        options["page_cache"] = PageCache(page_cache_dir, params, max_bytes=page_cache_max_bytes)
+
+    page_count = pdfinfo_from_path(pdf_path)["Pages"]
+
+    def report(record: Dict, done: int) -> None:
+        if progress_callback is not None:
+            progress_callback(page_progress_event(record, done, page_count))
+
+    cache, cache_key = None, None
+    if cache_dir and write_files:
+        cache = ScanCache(cache_dir, max_bytes=cache_max_bytes)
+        cache_key = cache.key(pdf_path, params)
+        pages = cache.load(cache_key, output_dir)
+        if pages is not None:
+            print(f"命中扫描缓存: {pdf_path}")
+            for done, record in enumerate(pages, start=1):
+                counts = Counter(b["type"] for g in record["groups"] for b in g["blocks"])
+                report(dict(record, stats={"timings": {}, "counts": dict(counts), "cached": True}), done)
+            return ScanResult.from_records(pdf_path, output_dir, dpi, padding, pages)
+
+    # 断点续跑：跳过同一份PDF、同一组参数下已完整输出的页面
+    pages = []
+    pending = list(range(1, page_count + 1))
+    if resume and write_files:
+        options["checkpoint_key"] = document_key(pdf_path, params)
+        pending = []
+        for page_num in range(1, page_count + 1):
+            record = load_completed_page(os.path.join(output_dir, f"page_{page_num}"), options["checkpoint_key"])
+            if record is None:
+                pending.append(page_num)
+                continue
+            counts = Counter(b["type"] for g in record["groups"] for b in g["blocks"])
+            pages.append(dict(record, stats={"timings": {}, "counts": dict(counts), "cached": True}))
+            report(pages[-1], len(pages))
+        if pages:
+            print(f"跳过已完成的页面: {[record['page'] for record in pages]}")
+
+    batch_size = max(1, detect_batch_size)
+    if pool is not None or workers > 1:
+        own_pool = pool is None
+        if own_pool:
+            pool = make_scan_pool(workers)
+        try:
+            futures = [pool.submit(_scan_pages_in_worker, pdf_path, page_nums, output_dir, dpi, options)
+                       for page_nums in page_runs(pending, batch_size)]
+            # 按完成顺序上报进度；任一页面出错都会在这里抛出
+            for future in as_completed(futures):
+                for record in future.result():
+                    pages.append(record)
+                    report(record, len(pages))
+        finally:
+            if own_pool:
+                pool.shutdown()
+    elif pending:
+        model = get_layout_model()
+        # 整份文档共用一个写出器，写盘与后续页面的检测、OCR重叠进行
+        writer = make_writer(async_write or visualize == "async")
+        try:
+            # 光栅化在 iter_pdf_pages 内按转换计时，窗口大于批大小时耗时不会全部记在第一批上
+            rasterize_seconds: Dict[int, float] = {}
+            page_iter = iter_pdf_pages(pdf_path, dpi=dpi, window=max(page_window, batch_size), page_nums=pending,
+                                       timings=rasterize_seconds)
+            while batch := list(islice(page_iter, batch_size)):
+                for record in scan_pages(batch, output_dir, model, pdf_path=pdf_path, writer=writer, **options):
+                    record["stats"]["timings"]["rasterize"] = rasterize_seconds.pop(record["page"], 0.0)
+                    pages.append(record)
+                    report(record, len(pages))
+        finally:
+            writer.close()
+
+    pages.sort(key=lambda record: record["page"])
+    if cache is not None:
+        cache.store(cache_key, output_dir, [_without_stats(record) for record in pages])
+    return ScanResult.from_records(pdf_path, output_dir if write_files else None, dpi, padding, pages)
+
+
+def document_output_dirs(pdf_paths: List[str], output_root: str) -> Dict[str, str]:
+    """为每份PDF分配独立的输出目录 output_root/<文件名>，重名时追加序号"""
+    output_dirs, used = {}, set()
+    for pdf_path in pdf_paths:
+        name = stem = Path(pdf_path).stem
+        suffix = 1
+        while name in used:
+            suffix += 1
+            name = f"{stem}_{suffix}"
+        used.add(name)
+        output_dirs[pdf_path] = os.path.join(output_root, name)
+    return output_dirs
+
+
+def extract_blocks_from_pdfs(pdf_paths: List[str], output_root: str, workers: int = 1,
+                             progress_callback: Optional[Callable[[str, Dict], None]] = None,
+                             **options) -> Tuple[Dict[str, ScanResult], Dict[str, Exception]]:
+    """批量扫描多份PDF，每份写到 output_root 下各自的目录，返回 (成功结果, 失败原因)
+    workers 大于1时所有文档共用一个进程池，各文档的页面同时排队，模型在每个工作进程中只加载一次；
+    否则在当前进程中依次扫描，共用同一个模型；
+    单份文档出错不影响其余文档；progress_callback 的参数为 (pdf_path, 进度事件)；
+    其余参数同 extract_blocks_from_pdf"""
+    output_dirs = document_output_dirs(pdf_paths, output_root)
+    results: Dict[str, ScanResult] = {}
+    errors: Dict[str, Exception] = {}
+
+    def scan_document(pdf_path: str, pool: Optional[ProcessPoolExecutor]) -> None:
+        callback = None
+        if progress_callback is not None:
+            callback = lambda event: progress_callback(pdf_path, event)
+        try:
+            results[pdf_path] = extract_blocks_from_pdf(pdf_path, output_dirs[pdf_path], pool=pool,
+                                                        progress_callback=callback, **options)
+        except Exception as e:
+            print(f"扫描 {pdf_path} 失败: {e}")
+            errors[pdf_path] = e
+
+    if workers > 1:
+        # 每份文档由一个轻量线程负责提交页面和收集结果，真正的计算都在共享进程池中
+        with make_scan_pool(workers) as pool, ThreadPoolExecutor(max_workers=workers) as submitters:
+            for future in [submitters.submit(scan_document, pdf_path, pool) for pdf_path in pdf_paths]:
+                future.result()
+    else:
+        warm_up_model()
+        for pdf_path in pdf_paths:
+            scan_document(pdf_path, None)
+    return results, errors
 
 
 # 调用示例
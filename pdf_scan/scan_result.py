@@ -0,0 +1,140 @@
+import os
+from typing import Dict, Iterator, List, Optional
+
+import cv2
+import numpy as np
+from pdf2image import convert_from_path
+
+
+class ScanBlock:
+    """扫描得到的一个区块：类型、坐标（页面像素）、识别文字及裁剪图像的延迟引用"""
+
+    def __init__(self, type: str, bbox: List[float], text: Optional[str] = None,
+                 score: Optional[float] = None, file: Optional[str] = None, page: "ScanPage" = None):
+        self.type = type
+        self.bbox = bbox
+        self.text = text
+        self.score = score
+        self.file = file
+        self.page = page
+        self.group: Optional["ScanGroup"] = None
+
+    @property
+    def image_path(self) -> Optional[str]:
+        """已写出的裁剪图像路径，未写出磁盘时为None"""
+        result = self.page.result if self.page else None
+        if not (result and result.output_dir and self.file and self.group):
+            return None
+        path = os.path.join(result.output_dir, f"page_{self.page.number}", self.group.name, f"{self.file}.png")
+        return path if os.path.exists(path) else None
+
+    def load_crop(self) -> np.ndarray:
+        """读取裁剪图像（RGB）：优先读已写出的文件，否则重新光栅化所在页面后裁剪"""
+        if path := self.image_path:
+            return cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2RGB)
+        result = self.page.result
+        image_cv = result.page_image(self.page.number)
+        h, w = image_cv.shape[:2]
+        x1, y1, x2, y2 = map(int, self.bbox)
+        pad = result.padding
+        return image_cv[max(0, y1 - pad):min(h, y2 + pad), max(0, x1 - pad):min(w, x2 + pad)]
+
+    def to_dict(self) -> Dict:
+        return {"file": self.file, "type": self.type, "bbox": self.bbox, "score": self.score, "text": self.text}
+
+    def __repr__(self):
+        return f"ScanBlock({self.type}, {self.file})"
+
+
+class ScanGroup:
+    """一个标题及其下方的内容区块；无标题引导的内容 title 为None"""
+
+    def __init__(self, name: str, title: Optional[ScanBlock] = None, content: List[ScanBlock] = None):
+        self.name = name
+        self.title = title
+        self.content = content if content is not None else []
+
+    @property
+    def blocks(self) -> List[ScanBlock]:
+        return ([self.title] if self.title else []) + self.content
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "blocks": [b.to_dict() for b in self.blocks]}
+
+
+class ScanPage:
+    """单个页面的扫描结果"""
+
+    def __init__(self, number: int, width: int, height: int, groups: List[ScanGroup] = None,
+                 result: "ScanResult" = None, stats: Optional[Dict] = None):
+        self.number = number
+        self.width = width
+        self.height = height
+        self.groups = groups if groups is not None else []
+        self.result = result
+        # 本次扫描的阶段耗时与区块计数，不参与序列化
+        self.stats = stats
+
+    def to_dict(self) -> Dict:
+        return {"page": self.number, "width": self.width, "height": self.height,
+                "groups": [g.to_dict() for g in self.groups]}
+
+
+class ScanResult:
+    """extract_blocks_from_pdf 的结构化结果：页面 → 分组 → 区块
+
+    下游可以直接在内存中使用；output_dir 为写出的目录树（未写出时裁剪图像按需重新光栅化）
+    """
+
+    def __init__(self, pdf_path: str, output_dir: Optional[str], dpi: int, padding: int,
+                 pages: List[ScanPage] = None):
+        self.pdf_path = pdf_path
+        self.output_dir = output_dir
+        self.dpi = dpi
+        self.padding = padding
+        self.pages = pages if pages is not None else []
+        self._cached_page = (None, None)
+
+    @classmethod
+    def from_records(cls, pdf_path: str, output_dir: Optional[str], dpi: int, padding: int,
+                     records: List[Dict]) -> "ScanResult":
+        """由 scan_page 返回的页面记录构建"""
+        result = cls(pdf_path, output_dir, dpi, padding)
+        for record in records:
+            page = ScanPage(record["page"], record["width"], record["height"], result=result,
+                            stats=record.get("stats"))
+            for group_record in record["groups"]:
+                group = ScanGroup(group_record["name"])
+                for b in group_record["blocks"]:
+                    block = ScanBlock(b["type"], b["bbox"], b.get("text"), b.get("score"), b.get("file"), page)
+                    block.group = group
+                    if b["type"] == "Title" and b.get("file") == "00_title":
+                        group.title = block
+                    else:
+                        group.content.append(block)
+                page.groups.append(group)
+            result.pages.append(page)
+        return result
+
+    def to_records(self) -> List[Dict]:
+        return [page.to_dict() for page in self.pages]
+
+    def iter_blocks(self, types: Optional[List[str]] = None) -> Iterator[ScanBlock]:
+        """按阅读顺序遍历所有区块，可按类型过滤"""
+        for page in self.pages:
+            for group in page.groups:
+                for block in group.blocks:
+                    if types is None or block.type in types:
+                        yield block
+
+    def page_image(self, page_num: int) -> np.ndarray:
+        """重新光栅化指定页面（RGB数组），只保留最近一页以限制内存"""
+        cached_num, cached_image = self._cached_page
+        if cached_num != page_num:
+            image = convert_from_path(self.pdf_path, dpi=self.dpi, first_page=page_num, last_page=page_num)[0]
+            cached_image = np.asarray(image.convert("RGB"))
+            self._cached_page = (page_num, cached_image)
+        return cached_image
+
+    def __len__(self):
+        return len(self.pages)
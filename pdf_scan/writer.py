@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+from typing import Dict
+
+import cv2
+import numpy as np
+
+
+def write_image_file(path: str, image_rgb: np.ndarray) -> None:
+    """立即保存RGB图像；已在写出任务中执行的代码直接调用，不再经过写出器排队"""
+    cv2.imwrite(path, cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR))
+
+
+def write_text_file(path: str, text: str) -> None:
+    """立即保存UTF-8文本"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+class FileWriter:
+    """同步写出区块图像与文本，extract_blocks_from_pdf 的所有区块输出都经过写出器"""
+
+    def write_image(self, path: str, image_rgb: np.ndarray) -> None:
+        """保存RGB图像"""
+        write_image_file(path, image_rgb)
+
+    def write_text(self, path: str, text: str) -> None:
+        """保存UTF-8文本"""
+        write_text_file(path, text)
+
+    def submit(self, fn, *args) -> None:
+        """执行任意写出任务，按提交顺序进行"""
+        fn(*args)
+
+    def flush(self) -> None:
+        """等待已提交的写出全部完成"""
+
+    def close(self) -> None:
+        """写完剩余内容并释放资源"""
+        self.flush()
+
+    def for_page(self, timings: Dict[str, float]) -> "FileWriter":
+        """供单个页面使用的写出器；同步写出时调用方已计时，直接返回自身"""
+        return self
+
+
+class BackgroundWriter(FileWriter):
+    """在后台线程中按提交顺序写出，检测与OCR循环不必等待磁盘
+
+    队列长度有上限：写盘跟不上时提交方会被阻塞，避免裁剪图像在内存中无限堆积。
+    写出过程中的第一个异常会在 flush/close 时重新抛出。经 for_page 提交的任务在写出线程上的
+    耗时累加到该页的 timings["write_background"]
+    """
+
+    def __init__(self, max_pending: int = 64):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="scan-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                # 出错后丢弃后续任务，只保留第一个异常
+                if self._error is None:
+                    fn, args, timings = job
+                    start = time.perf_counter()
+                    fn(*args)
+                    if timings is not None:
+                        timings["write_background"] = (timings.get("write_background", 0.0) +
+                                                       time.perf_counter() - start)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def write_image(self, path: str, image_rgb: np.ndarray) -> None:
+        self.submit(write_image_file, path, image_rgb)
+
+    def write_text(self, path: str, text: str) -> None:
+        self.submit(write_text_file, path, text)
+
+    def submit(self, fn, *args) -> None:
+        self._put(fn, args, None)
+
+    def _put(self, fn, args, timings) -> None:
+        if not self._thread.is_alive():
+            raise RuntimeError("写出线程已关闭")
+        self._queue.put((fn, args, timings))
+
+    def for_page(self, timings: Dict[str, float]) -> FileWriter:
+        return _PageWriter(self, timings)
+
+    def flush(self) -> None:
+        self._queue.join()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+
+class _PageWriter(FileWriter):
+    """BackgroundWriter 针对单个页面的视图：任务仍进入同一队列，写出线程上的耗时记入该页的 timings"""
+
+    def __init__(self, writer: BackgroundWriter, timings: Dict[str, float]):
+        self._writer = writer
+        self._timings = timings
+
+    def write_image(self, path: str, image_rgb: np.ndarray) -> None:
+        self.submit(write_image_file, path, image_rgb)
+
+    def write_text(self, path: str, text: str) -> None:
+        self.submit(write_text_file, path, text)
+
+    def submit(self, fn, *args) -> None:
+        self._writer._put(fn, args, self._timings)
+
+    def flush(self) -> None:
+        self._writer.flush()
+
+    def for_page(self, timings: Dict[str, float]) -> FileWriter:
+        return self._writer.for_page(timings)
@@ -97,7 +97,18 @@ def initialize_paper():
             os.makedirs(output_dir, exist_ok=True)
         
             # 调用extract_blocks_from_pdf函数
-            scan_pdf.extract_blocks_from_pdf(pdf_path=file_path, output_dir=output_dir)
+            # 按页显示扫描进度
+            progress_bar = st.progress(0.0, text=f"正在扫描 {file.name} ...")
+
+            def update_progress(event):
+                progress_bar.progress(event["done"] / event["total_pages"],
+                                      text=f"正在扫描 {file.name}：第 {event['done']} / {event['total_pages']} 页")
+
+            # 相同PDF再次上传时直接复用扫描缓存
+            scan_pdf.extract_blocks_from_pdf(pdf_path=file_path, output_dir=output_dir,
+                                             cache_dir=os.path.join(".", "scan_cache"),
+                                             progress_callback=update_progress)
+            progress_bar.empty()
             paper = main_data_process()
             db.save_paper(paper)
             paper.generate_summary(lang="en")
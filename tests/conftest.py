@@ -0,0 +1,46 @@
+from pathlib import Path
+
+import pytest
+
+# 一份三页的扫描结果（output2）：文章标题与摘要、跨页续写的章节、带编号的图表及其说明、
+# 没有正文的子章节和附录，覆盖 data_clean 各步骤的主要分支；图片内容只用于比对
+SCAN_TREE = {
+    "page_1/group_0/00_title.png": b"PNG",
+    "page_1/group_0/00_title.txt": "Deep Things",
+    "page_1/group_0/01_text.png": b"PNG",
+    "page_1/group_0/01_text.txt": "We study deep things in this abstract paragraph that is long enough.",
+    "page_1/group_1/00_title.txt": "1. Introduction",
+    "page_1/group_1/01_text.txt": "Intro paragraph one talks about the motivation behind it all.",
+    "page_1/group_1/02_text.txt": "Figure 1: Overview of the system",
+    "page_1/group_1/03_figure.png": b"FIG1",
+    "page_1/group_1/04_text.txt": "2. Method. The method text continues here for a while",
+    "page_2/group_0/01_text.txt": "continued text of the method section on page two, quite long.",
+    "page_2/group_0/02_list.png": b"LST",
+    "page_2/group_0/02_list.txt": "- item a\n- item b",
+    "page_2/group_1/00_title.txt": "2.1 Details",
+    "page_2/group_1/01_text.txt": "Table 2. Results on benchmarks",
+    "page_2/group_1/02_table.png": b"TAB2",
+    "page_2/group_2/00_title.txt": "2.3 More",
+    "page_2/group_2/01_text.txt": "more words",
+    "page_3/group_0/01_text.txt": "tail text",
+    "page_3/group_1/00_title.txt": "Appendix A Proofs",
+    "page_3/group_1/01_text.txt": "proof body",
+}
+
+
+def write_scan_tree(output2_dir: Path) -> Path:
+    for name, content in SCAN_TREE.items():
+        path = output2_dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            path.write_text(content, encoding="utf-8")
+    return output2_dir
+
+
+@pytest.fixture
+def scan_dir(tmp_path):
+    """tmp_path/scan/output2 中写好 SCAN_TREE，返回 tmp_path/scan（即 run_data_pipeline 的 base_dir）"""
+    write_scan_tree(tmp_path / "scan" / "output2")
+    return tmp_path / "scan"
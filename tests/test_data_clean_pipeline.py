@@ -0,0 +1,74 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+pytest.importorskip("index.index_module")
+from anytree import PreOrderIter
+
+from data_clean.main_processor import run_data_pipeline
+from data_clean.picture_classify import classify_pictures
+from data_clean.picture_classify2 import rename_pictures
+from data_clean.storedata import store_paper_data
+from data_clean.storedata_datacombine import combine_pages
+from data_clean.storedata_dataclean import clean_pages
+from data_clean.title_classify import classify_titles
+
+# 原先逐个运行各脚本（子进程、经由目录传递）时得到的大纲与图片列表
+EXPECTED_OUTLINE = [
+    (0, "Deep Things", "We study deep things in this abstract paragraph that is long enough."),
+    (1, "1. Introduction", "Intro paragraph one talks about the motivation behind it all."),
+    (1, "2. Method.", "The method text continues here for a while\n"
+                      "continued text of the method section on page two, quite long."),
+    (2, "2.1 Details", None),
+    (2, "2.3 More", "more words\ntail text"),
+    (1, "Appendix A Proofs", "proof body"),
+]
+EXPECTED_IMAGES = [
+    ("Figure1", "Overview of the system", b"FIG1"),
+    ("Table2", ". Results on benchmarks", b"TAB2"),
+]
+
+
+def run_directory_scripts(output2_dir: Path, base_dir: Path):
+    """按原来的顺序运行各脚本的目录版本，每一步都从上一步写出的目录读入"""
+    clean_pages(output2_dir, base_dir / "output0")
+    combine_pages(base_dir / "output0", base_dir / "output3", base_dir / "output4")
+    classify_titles(base_dir / "output4", base_dir / "output5")
+    classify_pictures(output2_dir, base_dir / "output_picture")
+    rename_pictures(base_dir / "output_picture", base_dir / "output_picture0")
+    return store_paper_data(base_dir / "output5", base_dir / "output_picture0")
+
+
+def outline(paper_info):
+    return [(node.depth, node.name, node.content.text if node.content is not None else None)
+            for node in PreOrderIter(paper_info.outline_root)]
+
+
+def images(paper_info):
+    return [(image["number"], image["description"], Path(image["path"]).read_bytes())
+            for image in paper_info.image_list]
+
+
+def tree_files(root: Path):
+    return {str(path.relative_to(root)): path.read_bytes() for path in sorted(root.rglob("*")) if path.is_file()}
+
+
+def test_directory_scripts_match_recorded_outline(scan_dir, tmp_path):
+    paper_info = run_directory_scripts(scan_dir / "output2", tmp_path / "scripts")
+    assert paper_info.title == "Deep Things"
+    assert outline(paper_info) == EXPECTED_OUTLINE
+    assert images(paper_info) == EXPECTED_IMAGES
+
+
+def test_in_memory_pipeline_matches_directory_scripts(scan_dir, tmp_path):
+    expected = run_directory_scripts(scan_dir / "output2", tmp_path / "scripts")
+    paper_info, results = run_data_pipeline(scan_dir, export_dir=tmp_path / "export", cache_dir=None)
+
+    assert all(result.ok for result in results), [result.format_error() for result in results]
+    assert paper_info.title == expected.title
+    assert outline(paper_info) == outline(expected)
+    assert images(paper_info) == images(expected)
+    for name in ("output5", "output_picture0"):
+        assert tree_files(tmp_path / "export" / name) == tree_files(tmp_path / "scripts" / name)
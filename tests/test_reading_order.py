@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from pdf_scan.reading_order import sort_blocks
+
+WIDTH = 1000
+
+
+def box(name, x_1, y_1, x_2, y_2):
+    return SimpleNamespace(name=name, block=SimpleNamespace(x_1=x_1, y_1=y_1, x_2=x_2, y_2=y_2))
+
+
+def reading_order(blocks):
+    return [b.name for b in sort_blocks(blocks, WIDTH)]
+
+
+def test_block_overhanging_the_gutter_stays_in_its_column():
+    blocks = [
+        box("L1", 50, 100, 530, 300),
+        box("R1", 520, 100, 950, 300),
+        box("L2", 50, 350, 480, 600),
+        box("R2", 520, 350, 950, 600),
+    ]
+    assert reading_order(blocks) == ["L1", "L2", "R1", "R2"]
+
+
+def test_figure_centred_on_the_gutter_is_spanning():
+    blocks = [
+        box("L1", 50, 100, 480, 300),
+        box("R1", 520, 100, 950, 300),
+        box("F", 250, 350, 750, 650),
+        box("L2", 50, 700, 480, 900),
+        box("R2", 520, 700, 950, 900),
+    ]
+    assert reading_order(blocks) == ["L1", "R1", "F", "L2", "R2"]
+
+
+def test_three_column_page():
+    blocks = [
+        box("title", 40, 40, 960, 90),
+        box("A1", 40, 120, 320, 400),
+        box("A2", 40, 420, 200, 450),
+        box("A3", 40, 470, 320, 900),
+        box("B1", 360, 120, 640, 500),
+        box("B2", 360, 520, 640, 900),
+        box("C1", 680, 120, 960, 300),
+        box("C2", 680, 320, 960, 700),
+        box("C3", 930, 720, 960, 740),
+        box("footer", 40, 950, 960, 980),
+    ]
+    assert reading_order(blocks) == ["title", "A1", "A2", "A3", "B1", "B2", "C1", "C2", "C3", "footer"]
+
+
+def test_single_column_with_short_lines():
+    blocks = [
+        box("heading", 100, 100, 300, 130),
+        box("p1", 100, 150, 900, 400),
+        box("caption", 400, 420, 600, 440),
+        box("p2", 100, 460, 900, 700),
+    ]
+    assert reading_order(blocks) == ["heading", "p1", "caption", "p2"]
@@ -0,0 +1,66 @@
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+pytest.importorskip("index.index_module")
+
+from data_clean import picture_classify, title_classify
+from data_clean.main_processor import run_data_pipeline
+
+# 带 STAGE_VERSION、结果可以缓存的步骤；load 与 storedata 每次都执行
+CACHED_STAGES = ["storedata_dataclean", "datacombine_groups", "datacombine_pages",
+                 "picture_classify", "picture_classify2", "title_classify"]
+
+
+def run(scan_dir, cache_dir, export_dir=None):
+    paper_info, results = run_data_pipeline(scan_dir, export_dir=export_dir, cache_dir=cache_dir)
+    assert all(result.ok for result in results), [result.format_error() for result in results]
+    return paper_info, {result.name: result.cached for result in results}
+
+
+def rerun_stages(cached):
+    return sorted(name for name in CACHED_STAGES if not cached[name])
+
+
+def test_second_run_hits_cache_for_all_versioned_stages(scan_dir, tmp_path):
+    first_info, first = run(scan_dir, tmp_path / "cache")
+    second_info, second = run(scan_dir, tmp_path / "cache")
+    assert rerun_stages(first) == sorted(CACHED_STAGES)
+    assert rerun_stages(second) == []
+    assert not second["load"] and not second["storedata"]
+    assert second_info.outline_root.children[0].name == first_info.outline_root.children[0].name
+
+
+def test_input_edit_reruns_everything_downstream(scan_dir, tmp_path):
+    run(scan_dir, tmp_path / "cache")
+    (scan_dir / "output2" / "page_3" / "group_1" / "01_text.txt").write_text("edited proof body", encoding="utf-8")
+    paper_info, cached = run(scan_dir, tmp_path / "cache")
+    assert rerun_stages(cached) == sorted(CACHED_STAGES)
+    assert paper_info.outline_root.children[-1].content.text == "edited proof body"
+
+
+def test_version_bump_reruns_only_that_stage_and_later(scan_dir, tmp_path, monkeypatch):
+    run(scan_dir, tmp_path / "cache")
+    monkeypatch.setattr(title_classify, "STAGE_VERSION", title_classify.STAGE_VERSION + 1)
+    _, cached = run(scan_dir, tmp_path / "cache")
+    assert rerun_stages(cached) == ["title_classify"]
+
+    monkeypatch.setattr(picture_classify, "STAGE_VERSION", picture_classify.STAGE_VERSION + 1)
+    _, cached = run(scan_dir, tmp_path / "cache")
+    assert rerun_stages(cached) == ["picture_classify", "picture_classify2"]
+
+
+def test_export_runs_on_cache_hit(scan_dir, tmp_path):
+    export_dir = tmp_path / "export"
+    run(scan_dir, tmp_path / "cache", export_dir)
+    exported = sorted(str(p.relative_to(export_dir)) for p in export_dir.rglob("*"))
+    shutil.rmtree(export_dir)
+
+    _, cached = run(scan_dir, tmp_path / "cache", export_dir)
+    assert rerun_stages(cached) == []
+    assert sorted(str(p.relative_to(export_dir)) for p in export_dir.rglob("*")) == exported
+    assert sorted(p.name for p in export_dir.iterdir()) == ["output0", "output3", "output4", "output5",
+                                                           "output_picture", "output_picture0"]